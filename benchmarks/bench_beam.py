@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- mode: python; coding: utf-8 -*-
+
+"""Measure how parsing time and accuracy grow with the beam size.
+
+Each test document is parsed with every beam size.  For each size, the
+script reports the total parsing time (best of several runs), its ratio
+to the time of greedy parsing, and the F1 scores of the parses.
+
+Example:
+  python benchmarks/bench_beam.py data/pcc-dis-bhatia/ data/conll/ -b 1 4 16
+
+"""
+
+##################################################################
+# Imports
+from __future__ import absolute_import, print_function, unicode_literals
+
+from timeit import default_timer
+import argparse
+import sys
+
+from common import add_data_options, get_edus, get_parser, quiet, span_f1
+from rstparser.parser import RSTParser
+
+
+##################################################################
+# Constants
+DFLT_BEAM_SIZES = [1, 2, 4, 8, 16]
+N_RUNS = 3
+
+
+##################################################################
+# Methods
+def main(argv):
+    """Run the benchmark.
+
+    :param list[str] argv: CLI arguments
+
+    """
+    argparser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    argparser.add_argument("-b", "--beam-sizes",
+                           help="beam sizes to test", type=int, nargs="+",
+                           default=DFLT_BEAM_SIZES)
+    add_data_options(argparser)
+    args = argparser.parse_args(argv)
+    quiet()
+
+    parser, trees = get_parser(args, RSTParser)
+    print("{:>5s} {:>9s} {:>8s} {:>8s} {:>8s}".format(
+        "beam", "seconds", "ratio", "span-F1", "rel-F1"))
+    base_time = None
+    for beam_size in args.beam_sizes:
+        seconds = float("inf")
+        for _ in range(N_RUNS):
+            start = default_timer()
+            pred_trees = [parser.parse(get_edus(tree), tree._conll_doc,
+                                       beam_size=beam_size)
+                          for tree in trees]
+            seconds = min(seconds, default_timer() - start)
+        if base_time is None:
+            base_time = seconds
+        print("{:>5d} {:>9.3f} {:>8.2f} {:>8.4f} {:>8.4f}".format(
+            beam_size, seconds, seconds / base_time,
+            span_f1(trees, pred_trees), span_f1(trees, pred_trees, 3)))
+
+
+##################################################################
+# Main
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- mode: python; coding: utf-8 -*-
+
+"""Compare throughput and accuracy of greedy and chart-based parsing.
+
+Example:
+  python benchmarks/bench_chart.py data/pcc-dis-bhatia/ data/conll/
+
+"""
+
+##################################################################
+# Imports
+from __future__ import absolute_import, print_function, unicode_literals
+
+from timeit import default_timer
+import argparse
+import sys
+
+from common import (add_data_options, get_edus, get_parser, quiet,
+                    span_f1)
+from rstparser.chart import ChartParser
+
+
+##################################################################
+# Constants
+DFLT_WIDTHS = [2, 4, 8, 0]
+
+
+##################################################################
+# Methods
+def main(argv):
+    """Run the benchmark.
+
+    :param list[str] argv: CLI arguments
+
+    """
+    argparser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    argparser.add_argument("-w", "--max-width",
+                           help="maximum span widths of the chart parser"
+                           " to test (0 means unbounded)", type=int,
+                           nargs="+", default=DFLT_WIDTHS)
+    add_data_options(argparser)
+    args = argparser.parse_args(argv)
+    quiet()
+
+    parser, trees = get_parser(args, ChartParser)
+    n_edus = sum(len(t.get_edu_nodes()) for t in trees)
+    print("{:<16s} {:>10s} {:>10s} {:>8s} {:>8s}".format(
+        "engine", "docs/s", "EDUs/s", "span-F1", "rel-F1"))
+
+    def report(name, parse):
+        docs = [(get_edus(t), t._conll_doc) for t in trees]
+        start = default_timer()
+        pred_trees = parse(docs)
+        elapsed = default_timer() - start
+        print("{:<16s} {:>10.1f} {:>10.1f} {:>8.4f} {:>8.4f}".format(
+            name, len(docs) / elapsed, n_edus / elapsed,
+            span_f1(trees, pred_trees), span_f1(trees, pred_trees, 3)))
+
+    report("greedy", lambda docs: [
+        super(ChartParser, parser).parse(edus, conll_doc)
+        for edus, conll_doc in docs
+    ])
+    for width in args.max_width:
+        parser.max_width = width or None
+        report("chart (w={:s})".format(str(width or "inf")), lambda docs: [
+            parser.parse(edus, conll_doc) for edus, conll_doc in docs
+        ])
+
+
+##################################################################
+# Main
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- mode: python; coding: utf-8 -*-
+
+"""Compare size, load time, speed, and accuracy of compacted models.
+
+The trained (or given) model is compacted with every combination of
+weight thresholds and quantization types.  For each variant, the script
+reports the number of kept features and weights, the size of the saved
+model, its load time, the greedy parsing time per parser step, the
+share of parsed documents identical to those of the original model, the
+F1 scores on the test documents, and whether the variant parses every
+document identically after a round trip through the memory-mappable
+format (and the size of that format).
+
+Example:
+  python benchmarks/bench_compact.py data/pcc-dis-bhatia/ data/conll/
+
+"""
+
+##################################################################
+# Imports
+from __future__ import absolute_import, print_function, unicode_literals
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+from common import (add_data_options, get_parser, get_size, load,
+                    measure_parsing, quiet, span_f1)
+from rstparser.parser import RSTParser
+from rstparser.scorer import QUANTIZATIONS
+
+
+##################################################################
+# Constants
+DFLT_THRESHOLDS = [0., 0.01]
+
+
+##################################################################
+# Methods
+def main(argv):
+    """Run the benchmark.
+
+    :param list[str] argv: CLI arguments
+
+    """
+    argparser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    argparser.add_argument("-t", "--thresholds",
+                           help="absolute weights up to which weights are"
+                           " dropped", type=float, nargs="+",
+                           default=DFLT_THRESHOLDS)
+    add_data_options(argparser)
+    args = argparser.parse_args(argv)
+    quiet()
+
+    parser, trees = get_parser(args, RSTParser)
+    tmp_dir = tempfile.mkdtemp()
+    print("{:<8s} {:>7s} {:>8s} {:>8s} {:>8s} {:>8s} {:>8s} {:>7s} {:>8s}"
+          " {:>8s} {:>8s} {:>7s}".format(
+              "quant", "thresh", "feats", "weights", "size MB", "load ms",
+              "us/step", "same", "span-F1", "rel-F1", "mmap MB", "mmap-eq"))
+    try:
+        orig_path = os.path.join(tmp_dir, "orig.model")
+        parser.save(orig_path)
+
+        def report(name, threshold, parser, mpath):
+            parser, size, load_time, _ = load(mpath, RSTParser)
+            weights = parser._model._get_coef()
+            pred_trees, latency = measure_parsing(parser, trees)
+            pred_strs = [t.to_str(tree._conll_doc)
+                         for t, tree in zip(pred_trees, trees)]
+            mmap_path = os.path.join(tmp_dir, "mmap.model")
+            shutil.rmtree(mmap_path, ignore_errors=True)
+            parser.save(mmap_path, mmap=True)
+            mmap_strs = [t.to_str(tree._conll_doc) for t, tree in zip(
+                measure_parsing(RSTParser(mpath=mmap_path), trees, 1)[0],
+                trees)]
+            print("{:<8s} {:>7s} {:>8d} {:>8d} {:>8.2f} {:>8.1f} {:>8.2f}"
+                  " {:>7.3f} {:>8.4f} {:>8.4f} {:>8.2f} {:>7s}".format(
+                      name, threshold, weights.shape[1],
+                      int((weights != 0).sum()), size, load_time, latency,
+                      sum(a == b for a, b in zip(pred_strs, orig_strs))
+                      / float(len(trees)),
+                      span_f1(trees, pred_trees),
+                      span_f1(trees, pred_trees, 3), get_size(mmap_path),
+                      str(mmap_strs == pred_strs)))
+
+        orig_strs = [t.to_str(tree._conll_doc) for t, tree in zip(
+            measure_parsing(parser, trees, 1)[0], trees)]
+        report("original", "-", parser, orig_path)
+        for threshold in args.thresholds:
+            for quantize in (None,) + QUANTIZATIONS:
+                parser = RSTParser(mpath=orig_path)
+                parser.compact(quantize, threshold)
+                mpath = os.path.join(tmp_dir, "compact.model")
+                parser.save(mpath)
+                report(quantize or "float64", "{:g}".format(threshold),
+                       parser, mpath)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+##################################################################
+# Main
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- mode: python; coding: utf-8 -*-
+
+"""Compare exhaustive and successive-halving grid searches.
+
+A model is trained with a grid search over the hyper-parameters of the
+SVM on the first part of the data for each number of processes and each
+halving factor (where 0 means an exhaustive search) and is evaluated on
+the remaining documents.  For each search, the script reports the wall
+time of the whole training, the number of trained candidates and the
+sum of their training times, the best parameters, and the F1 scores of
+the final model.
+
+Example:
+  python benchmarks/bench_grid_search.py data/pcc-dis-bhatia/ data/conll/ \
+    -j 1 4 -f 0 3
+
+"""
+
+##################################################################
+# Imports
+from __future__ import absolute_import, print_function, unicode_literals
+
+from timeit import default_timer
+import argparse
+import sys
+
+from common import (add_data_options, measure_parsing, quiet, read_dis_data,
+                    span_f1)
+from rstparser.model import GRID_METRIC
+from rstparser.parser import RSTParser
+
+
+##################################################################
+# Constants
+DFLT_JOBS = [1, 4]
+DFLT_FACTORS = [0, 3]
+
+
+##################################################################
+# Methods
+def main(argv):
+    """Run the benchmark.
+
+    :param list[str] argv: CLI arguments
+
+    """
+    argparser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    argparser.add_argument("-j", "--jobs",
+                           help="numbers of processes to test", type=int,
+                           nargs="+", default=DFLT_JOBS)
+    argparser.add_argument("-f", "--factors",
+                           help="halving factors to test (0 means"
+                           " exhaustive search)", type=int, nargs="+",
+                           default=DFLT_FACTORS)
+    add_data_options(argparser, model=False)
+    args = argparser.parse_args(argv)
+    quiet()
+
+    trees = read_dis_data(args.dis_dir, args.conll_dir)
+    train_trees = trees[:args.n_train]
+    test_trees = trees[args.n_train:]
+    print("{:>6s} {:>4s} {:>8s} {:>5s} {:>8s} {:>8s} {:>8s}  {:s}".format(
+        "factor", "jobs", "wall s", "fits", "fit s", "span-F1", "rel-F1",
+        "best parameters"))
+    for factor in args.factors:
+        for n_jobs in args.jobs:
+            parser = RSTParser([], [], None)
+            start = default_timer()
+            parser.train(train_trees, grid_search=True, n_jobs=n_jobs,
+                         halving_factor=factor or None)
+            wall_time = default_timer() - start
+            results = parser.grid_results
+            best = max((result for result in results
+                        if result["round"] == results[-1]["round"]),
+                       key=lambda result: result[GRID_METRIC])["params"]
+            pred_trees = measure_parsing(parser, test_trees, 1)[0]
+            print("{:>6d} {:>4d} {:>8.1f} {:>5d} {:>8.1f} {:>8.4f} {:>8.4f}"
+                  "  {:s}".format(
+                      factor, n_jobs, wall_time, len(results),
+                      sum(result["time"] for result in results),
+                      span_f1(test_trees, pred_trees),
+                      span_f1(test_trees, pred_trees, 3),
+                      ", ".join("{:s}={!r}".format(name, value)
+                                for name, value in sorted(best.items()))))
+
+
+##################################################################
+# Main
+if __name__ == "__main__":
+    main(sys.argv[1:])
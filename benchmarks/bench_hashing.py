@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- mode: python; coding: utf-8 -*-
+
+"""Compare model size, load time, and accuracy of hashed features.
+
+A model is trained on the first part of the data for each hash width
+(0 means a full feature vocabulary without hashing) and evaluated on
+the remaining documents.
+
+Example:
+  python benchmarks/bench_hashing.py data/pcc-dis-bhatia/ data/conll/
+
+"""
+
+##################################################################
+# Imports
+from __future__ import absolute_import, print_function, unicode_literals
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+from common import (add_data_options, get_edus, load, quiet, read_dis_data,
+                    span_f1)
+from rstparser.parser import RSTParser
+
+
+##################################################################
+# Constants
+DFLT_WIDTHS = [0, 2**12, 2**14, 2**16, 2**18]
+
+
+##################################################################
+# Methods
+def main(argv):
+    """Run the benchmark.
+
+    :param list[str] argv: CLI arguments
+
+    """
+    argparser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    argparser.add_argument("-w", "--widths",
+                           help="numbers of hash columns to test (0 means"
+                           " no hashing)", type=int, nargs="+",
+                           default=DFLT_WIDTHS)
+    add_data_options(argparser, model=False)
+    args = argparser.parse_args(argv)
+    quiet()
+
+    trees = read_dis_data(args.dis_dir, args.conll_dir)
+    train_trees = trees[:args.n_train]
+    test_trees = trees[args.n_train:]
+    tmp_dir = tempfile.mkdtemp()
+    print("{:>8s} {:>9s} {:>9s} {:>9s} {:>9s} {:>8s} {:>8s} {:>8s}".format(
+        "width", "columns", "size MB", "load ms", "mem MB", "span-F1",
+        "nuc-F1", "rel-F1"))
+    try:
+        for width in args.widths:
+            parser = RSTParser([], [], None, hash_width=width or None)
+            parser.train(train_trees)
+            mpath = os.path.join(tmp_dir, "{:d}.model".format(width))
+            parser.save(mpath)
+            parser, size, load_time, memory = load(mpath, RSTParser)
+            n_columns = parser._model._clf.steps[-1][1].coef_.shape[1]
+            pred_trees = [parser.parse(get_edus(t), t._conll_doc)
+                          for t in test_trees]
+            print("{:>8s} {:>9d} {:>9.2f} {:>9.1f} {:>9.2f} {:>8.4f} {:>8.4f}"
+                  " {:>8.4f}".format(
+                      str(width or "-"), n_columns, size, load_time,
+                      memory, span_f1(test_trees, pred_trees),
+                      span_f1(test_trees, pred_trees, 2),
+                      span_f1(test_trees, pred_trees, 3)))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+##################################################################
+# Main
+if __name__ == "__main__":
+    main(sys.argv[1:])
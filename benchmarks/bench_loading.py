@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- mode: python; coding: utf-8 -*-
+
+"""Compare loading of pickled and memory-mapped models.
+
+The trained (or given) model is stored in both formats.  For each
+format, the script reports the size on disk, the load time, the time of
+the first parse after loading (which includes reading the mapped
+pages), the greedy parsing time per parser step, whether the parses are
+identical to those of the original model, and the proportional memory
+(PSS, Linux only) of each of several forked workers which load the
+model at the same time.
+
+Example:
+  python benchmarks/bench_loading.py data/pcc-dis-bhatia/ data/conll/
+
+"""
+
+##################################################################
+# Imports
+from __future__ import absolute_import, print_function, unicode_literals
+
+from timeit import default_timer
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+
+from common import (add_data_options, get_edus, get_parser, get_size,
+                    measure_parsing, quiet)
+from rstparser.parser import RSTParser
+
+
+##################################################################
+# Constants
+N_LOADS = 5
+DFLT_N_WORKERS = 4
+SMAPS_PATH = "/proc/self/smaps_rollup"
+
+
+##################################################################
+# Methods
+def get_pss():
+    """Get proportional set size of the current process.
+
+    :return: PSS in MB or None if it cannot be determined
+    :rtype: float or None
+
+    """
+    if not os.path.exists(SMAPS_PATH):
+        return None
+    with open(SMAPS_PATH) as ifile:
+        for iline in ifile:
+            if iline.startswith("Pss:"):
+                return int(iline.split()[1]) / 2.**10
+    return None
+
+
+def worker(mpath, tree, barrier, queue):
+    """Load a model and parse a document while other workers do the same.
+
+    :param str mpath: path to the model
+    :param RSTTree tree: document to parse
+    :param multiprocessing.Barrier barrier: barrier of all workers
+    :param multiprocessing.Queue queue: queue for the measured PSS
+
+    """
+    parser = RSTParser(mpath=mpath)
+    parser.parse(get_edus(tree), tree._conll_doc)
+    barrier.wait()
+    queue.put(get_pss())
+    barrier.wait()
+
+
+def measure_workers(mpath, tree, n_workers):
+    """Measure memory of forked workers which load the same model.
+
+    :param str mpath: path to the model
+    :param RSTTree tree: document to parse
+    :param int n_workers: number of workers
+
+    :return: mean PSS of the workers in MB or None if unknown
+    :rtype: float or None
+
+    """
+    if get_pss() is None:
+        return None
+    barrier = multiprocessing.Barrier(n_workers)
+    queue = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=worker,
+                                       args=(mpath, tree, barrier, queue))
+               for _ in range(n_workers)]
+    for proc in workers:
+        proc.start()
+    pss = [queue.get() for _ in workers]
+    for proc in workers:
+        proc.join()
+    return sum(pss) / len(pss)
+
+
+def main(argv):
+    """Run the benchmark.
+
+    :param list[str] argv: CLI arguments
+
+    """
+    argparser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    argparser.add_argument("-w", "--workers",
+                           help="number of forked workers", type=int,
+                           default=DFLT_N_WORKERS)
+    add_data_options(argparser)
+    args = argparser.parse_args(argv)
+    quiet()
+
+    parser, trees = get_parser(args, RSTParser)
+    ref_trees = measure_parsing(parser, trees, 1)[0]
+    ref_strs = [t.to_str(tree._conll_doc)
+                for t, tree in zip(ref_trees, trees)]
+    tmp_dir = tempfile.mkdtemp()
+    print("{:<8s} {:>8s} {:>8s} {:>10s} {:>8s} {:>9s} {:>12s}".format(
+        "format", "size MB", "load ms", "1st-doc ms", "us/step", "identical",
+        "worker PSS MB"))
+    try:
+        for name, mmap in (("pickle", False), ("mmap", True)):
+            mpath = os.path.join(tmp_dir, name)
+            parser.save(mpath, mmap=mmap)
+            load_time = first_time = float("inf")
+            for _ in range(N_LOADS):
+                start = default_timer()
+                loaded = RSTParser(mpath=mpath)
+                load_time = min(load_time, default_timer() - start)
+                start = default_timer()
+                loaded.parse(get_edus(trees[0]), trees[0]._conll_doc)
+                first_time = min(first_time, default_timer() - start)
+            pred_trees, latency = measure_parsing(loaded, trees)
+            identical = all(t.to_str(tree._conll_doc) == ref
+                            for t, tree, ref in zip(pred_trees, trees,
+                                                    ref_strs))
+            pss = measure_workers(mpath, trees[0], args.workers)
+            print("{:<8s} {:>8.2f} {:>8.1f} {:>10.1f} {:>8.2f} {:>9s}"
+                  " {:>12s}".format(
+                      name, get_size(mpath), 1e3 * load_time,
+                      1e3 * first_time, latency, str(identical),
+                      "-" if pss is None else "{:.1f}".format(pss)))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+##################################################################
+# Main
+if __name__ == "__main__":
+    main(sys.argv[1:])
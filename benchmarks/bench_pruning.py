@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- mode: python; coding: utf-8 -*-
+
+"""Compare vocabulary size, model size, and speed of pruned models.
+
+A model is trained on the first part of the data for each minimum
+feature frequency (and optionally for each maximum vocabulary size)
+and evaluated on the remaining documents.  The prediction latency is
+the greedy parsing time per parser step.
+
+Example:
+  python benchmarks/bench_pruning.py data/pcc-dis-bhatia/ data/conll/ \
+    -f 1 2 3 5 10
+
+"""
+
+##################################################################
+# Imports
+from __future__ import absolute_import, print_function, unicode_literals
+
+from timeit import default_timer
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+from common import (add_data_options, get_size, measure_parsing, quiet,
+                    read_dis_data, span_f1)
+from rstparser.parser import RSTParser
+
+
+##################################################################
+# Constants
+DFLT_MIN_FREQS = [1, 2, 3, 5, 10]
+
+
+##################################################################
+# Methods
+def main(argv):
+    """Run the benchmark.
+
+    :param list[str] argv: CLI arguments
+
+    """
+    argparser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    argparser.add_argument("-f", "--min-freqs",
+                           help="minimum feature frequencies to test",
+                           type=int, nargs="+", default=DFLT_MIN_FREQS)
+    argparser.add_argument("-k", "--max-features",
+                           help="maximum vocabulary sizes to test (with the"
+                           " lowest minimum frequency)", type=int,
+                           nargs="+", default=[])
+    add_data_options(argparser, model=False)
+    args = argparser.parse_args(argv)
+    quiet()
+
+    trees = read_dis_data(args.dis_dir, args.conll_dir)
+    train_trees = trees[:args.n_train]
+    test_trees = trees[args.n_train:]
+    min_freq = min(args.min_freqs)
+    configs = [(freq, None) for freq in args.min_freqs] \
+        + [(min_freq, size) for size in args.max_features]
+    tmp_dir = tempfile.mkdtemp()
+    print("{:>8s} {:>8s} {:>8s} {:>9s} {:>9s} {:>10s} {:>8s} {:>8s}".format(
+        "min-freq", "max-feat", "vocab", "size MB", "train s", "us/step",
+        "span-F1", "rel-F1"))
+    try:
+        for freq, size in configs:
+            parser = RSTParser([], [], None)
+            start = default_timer()
+            parser.train(train_trees, min_freq=freq, max_features=size)
+            train_time = default_timer() - start
+            mpath = os.path.join(tmp_dir, "model")
+            parser.save(mpath)
+            model_size = get_size(mpath)
+            parser = RSTParser(mpath=mpath)
+            vocab_size = len(parser._model._clf.steps[0][1].vocabulary_)
+            pred_trees, latency = measure_parsing(parser, test_trees)
+            print("{:>8d} {:>8s} {:>8d} {:>9.2f} {:>9.2f} {:>10.2f} {:>8.4f}"
+                  " {:>8.4f}".format(
+                      freq, str(size or "-"), vocab_size, model_size,
+                      train_time, latency, span_f1(test_trees, pred_trees),
+                      span_f1(test_trees, pred_trees, 3)))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+##################################################################
+# Main
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+# -*- mode: python; coding: utf-8 -*-
+
+"""Measure how processing stages scale with the size of a document.
+
+Synthetic dis and CoNLL documents with random binary RST trees are
+generated for each of the given sizes.  For every stage, the script
+reports time (best of several runs) and peak memory and estimates the
+growth exponent from the largest sizes, flagging stages which grow worse
+than linearly.
+
+The size of the DIS output grows with the depth of the predicted tree,
+since every line is indented by the depth of its node.  Trees predicted
+for long documents are deep (their mean depth grows linearly with the
+number of EDUs), so the output itself grows quadratically, and the peak
+memory of the to-str stage (its pieces and the joined string, about
+twice the output) does as well.  The exponents of the to-str stage are
+therefore estimated against the length of its output, and the growth of
+the output is reported separately (without flagging it).
+
+Example:
+  python benchmarks/bench_scaling.py -n 10 100 1000 10000 50000
+
+"""
+
+##################################################################
+# Imports
+from __future__ import absolute_import, print_function, unicode_literals
+
+from timeit import default_timer
+import argparse
+import gc
+import math
+import random
+import sys
+import tracemalloc
+
+from common import get_edus, quiet
+from rstparser.conll import CoNLLDoc
+from rstparser.feature import FeatureExtractor
+from rstparser.parser import RSTParser
+from rstparser.tree import RSTTree
+
+
+##################################################################
+# Constants
+DFLT_SIZES = [10, 100, 1000, 10000, 50000]
+DFLT_MAX_EXPONENT = 1.2
+DFLT_N_TRAIN = 30
+DFLT_TRAIN_SIZE = 40
+DFLT_SEED = 1
+DFLT_N_RUNS = 3
+N_WORDS = 2000
+MIN_EDU_LEN = 3
+MAX_EDU_LEN = 12
+# sizes below this threshold are too noisy for estimating the growth
+MIN_FIT_SIZE = 2000
+FORMS = ("NN", "NS", "SN")
+RELATIONS = ("elaboration", "contrast", "cause", "condition", "joint",
+             "background", "evaluation", "purpose")
+POS_TAGS = ("NN", "NE", "VVFIN", "ART", "ADJA", "APPR", "ADV", "KON")
+
+
+##################################################################
+# Methods
+def make_doc(n_edus, rnd):
+    """Generate a document with a random binary RST tree.
+
+    :param int n_edus: number of EDUs in the document
+    :param random.Random rnd: random number generator
+
+    :return: content of the dis file and lines of the CoNLL file
+    :rtype: tuple(str, list[str])
+
+    """
+    dis = []
+    conll = []
+    tidx = 0
+    # pending tree nodes (start, end, nuclearity, relation) and strings
+    todo = [(1, n_edus, "Root", None)]
+    while todo:
+        item = todo.pop()
+        if not isinstance(item, tuple):
+            dis.append(item)
+            continue
+        start, end, prop, relation = item
+        dis.append("(" + prop)
+        if start == end:
+            dis.append(" (leaf {:d})".format(start))
+        else:
+            dis.append(" (span {:d} {:d})".format(start, end))
+        if relation:
+            dis.append(" (rel2par " + relation + ")")
+        if start == end:
+            # every other EDU starts a new sentence on average
+            if rnd.random() < 0.5:
+                tidx = 0
+            words = []
+            for _ in range(rnd.randint(MIN_EDU_LEN, MAX_EDU_LEN)):
+                word = "w{:d}".format(rnd.randrange(N_WORDS))
+                pos = rnd.choice(POS_TAGS)
+                tidx += 1
+                conll.append("\t".join((
+                    str(tidx), word, word, word, pos, pos, "_", "_", "-1",
+                    "0" if tidx == 1 else "1", "_",
+                    "--" if tidx == 1 else "NK", "_", "_"
+                )))
+                words.append(word)
+            dis.append(" (text _!" + " ".join(words) + "_!))")
+            continue
+        split = rnd.randint(start, end - 1)
+        form = rnd.choice(FORMS)
+        relation = rnd.choice(RELATIONS)
+        if form == "NN":
+            left = ("Nucleus", relation)
+            right = ("Nucleus", relation)
+        elif form == "NS":
+            left = ("Nucleus", "span")
+            right = ("Satellite", relation)
+        else:
+            left = ("Satellite", relation)
+            right = ("Nucleus", "span")
+        todo.extend([")", (split + 1, end) + right, (start, split) + left])
+    return "".join(dis), conll
+
+
+def run_stages(parser, dis, conll, measure):
+    """Run all processing stages on a document.
+
+    :param RSTParser parser: parser to use
+    :param str dis: content of the dis file
+    :param list[str] conll: lines of the CoNLL file
+    :param callable measure: function which runs a stage and returns a
+      tuple of its result and measured value
+
+    :return: measured values of the stages and the length of the DIS
+      output
+    :rtype: tuple(list[tuple(str, float)], int)
+
+    """
+    values = []
+
+    def stage(name, func, *args):
+        result, value = measure(func, *args)
+        values.append((name, value))
+        return result
+
+    conll_doc = stage("read-conll", CoNLLDoc, conll)
+    tree = stage("read-dis", RSTTree, dis, conll_doc)
+    samples = stage("samples", lambda: tree.generate_samples()[1])
+    feat_extractor = FeatureExtractor()
+    stage("features", lambda: [feat_extractor.extract_feats(*sample)
+                               for sample in samples])
+    edus = get_edus(tree)
+    pred_tree = stage("parse", parser.parse, edus, conll_doc)
+    output = stage("to-str", pred_tree.to_str, conll_doc)
+    return values, len(output)
+
+
+def measure_time(func, *args):
+    """Run function and measure its execution time in seconds.
+
+    Like `timeit`, the cyclic garbage collector is disabled during the
+    measurement, since its full collections scan all live objects and
+    would otherwise make every allocation-heavy stage look super-linear.
+
+    """
+    gc.collect()
+    gc.disable()
+    try:
+        start = default_timer()
+        result = func(*args)
+        elapsed = default_timer() - start
+    finally:
+        gc.enable()
+    return result, elapsed
+
+
+def measure_memory(func, *args):
+    """Run function and measure its peak memory allocation in MB.
+
+    """
+    tracemalloc.start()
+    try:
+        result = func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak / 2.**20
+
+
+def get_exponent(sizes, values, xs=None):
+    """Estimate growth exponent by a least-squares fit in log-log space.
+
+    :param list[int] sizes: document sizes
+    :param list[float] values: measured values
+    :param xs: quantities against which the growth is estimated
+      (document sizes if None)
+    :type xs: list[float] or None
+
+    :return: estimated exponent or None if there are too few points
+    :rtype: float or None
+
+    """
+    if xs is None:
+        xs = sizes
+    points = [(math.log(x), math.log(v))
+              for n, x, v in zip(sizes, xs, values)
+              if n >= MIN_FIT_SIZE and v > 0]
+    if len(points) < 2:
+        points = [(math.log(x), math.log(v))
+                  for x, v in list(zip(xs, values))[-2:] if v > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in points)
+    var = sum((x - mean_x) ** 2 for x, _ in points)
+    return cov / var if var else None
+
+
+def main(argv):
+    """Run the benchmark.
+
+    :param list[str] argv: CLI arguments
+
+    :return: 0 if all stages grow at most linearly, 1 otherwise
+    :rtype: int
+
+    """
+    argparser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    argparser.add_argument("-m", "--model",
+                           help="path to a trained model (a new model is"
+                           " trained on small synthetic documents if"
+                           " omitted)")
+    argparser.add_argument("-n", "--sizes",
+                           help="numbers of EDUs in the generated documents",
+                           type=int, nargs="+", default=DFLT_SIZES)
+    argparser.add_argument("--max-exponent",
+                           help="flag stages whose estimated growth"
+                           " exponent exceeds this value", type=float,
+                           default=DFLT_MAX_EXPONENT)
+    argparser.add_argument("-r", "--runs",
+                           help="number of runs of which the fastest one"
+                           " is reported", type=int, default=DFLT_N_RUNS)
+    argparser.add_argument("--seed", help="random seed", type=int,
+                           default=DFLT_SEED)
+    args = argparser.parse_args(argv)
+    quiet()
+
+    rnd = random.Random(args.seed)
+    if args.model:
+        parser = RSTParser([], [], args.model)
+    else:
+        parser = RSTParser([], [], None)
+        train_trees = []
+        for _ in range(DFLT_N_TRAIN):
+            dis, conll = make_doc(DFLT_TRAIN_SIZE, rnd)
+            train_trees.append(RSTTree(dis, CoNLLDoc(conll)))
+        parser.train(train_trees)
+
+    sizes = sorted(args.sizes)
+    times = []
+    memory = []
+    out_lens = []
+    print("{:>8s} {:<12s} {:>10s} {:>12s} {:>10s}".format(
+        "EDUs", "stage", "seconds", "us/EDU", "peak MB"))
+    for n_edus in sizes:
+        dis, conll = make_doc(n_edus, rnd)
+        runs = [run_stages(parser, dis, conll, measure_time)[0]
+                for _ in range(args.runs)]
+        times.append([(stage, min(run[i][1] for run in runs))
+                      for i, (stage, _) in enumerate(runs[0])])
+        mem_values, out_len = run_stages(parser, dis, conll, measure_memory)
+        memory.append(mem_values)
+        out_lens.append(out_len)
+        for (stage, seconds), (_, peak) in zip(times[-1], memory[-1]):
+            print("{:>8d} {:<12s} {:>10.4f} {:>12.2f} {:>10.2f}".format(
+                n_edus, stage, seconds, 1e6 * seconds / n_edus, peak))
+
+    print("\n{:<12s} {:>10s} {:>10s}".format("stage", "time-exp",
+                                             "mem-exp"))
+    ret = 0
+    for i, (stage, _) in enumerate(times[0]):
+        # the serialization is linear in its (possibly quadratic) output
+        xs = out_lens if stage == "to-str" else None
+        time_exp = get_exponent(sizes, [values[i][1] for values in times],
+                                xs)
+        mem_exp = get_exponent(sizes, [values[i][1] for values in memory],
+                               xs)
+        flag = ""
+        if any(exp is not None and exp > args.max_exponent
+               for exp in (time_exp, mem_exp)):
+            flag = "  SUPER-LINEAR"
+            ret = 1
+        time_exp, mem_exp = ["-" if exp is None else "{:.2f}".format(exp)
+                             for exp in (time_exp, mem_exp)]
+        print("{:<12s} {:>10s} {:>10s}{:s}".format(stage, time_exp, mem_exp,
+                                                   flag))
+    out_exp = get_exponent(sizes, out_lens)
+    print("{:<12s} {:>10s} {:>10s}  (growth of the DIS output)".format(
+        "output", "-", "-" if out_exp is None else "{:.2f}".format(out_exp)))
+    return ret
+
+
+##################################################################
+# Main
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
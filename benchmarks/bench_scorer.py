@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- mode: python; coding: utf-8 -*-
+
+"""Compare exported linear scorers with the scikit-learn pipeline.
+
+Parser states are collected from the gold action sequences of the test
+documents.  For each scorer, the script reports the maximum absolute
+difference of its scores from the pipeline's decision function, the
+share of states on which both choose the same action, and the time per
+state when states are scored one at a time (as in greedy parsing) and
+all at once, both for scoring alone and including the lookup of
+feature columns.
+
+Example:
+  python benchmarks/bench_scorer.py data/pcc-dis-bhatia/ data/conll/
+
+"""
+
+##################################################################
+# Imports
+from __future__ import absolute_import, print_function, unicode_literals
+
+from timeit import default_timer
+import argparse
+import gc
+import sys
+
+import numpy as np
+
+from common import add_data_options, get_parser, quiet
+from rstparser.parser import RSTParser
+
+
+##################################################################
+# Constants
+N_RUNS = 5
+
+
+##################################################################
+# Methods
+def measure(func, n_states):
+    """Measure the best time of a function in microseconds per state.
+
+    :param callable func: function to run
+    :param int n_states: number of states processed by the function
+
+    :return: microseconds per state
+    :rtype: float
+
+    """
+    seconds = float("inf")
+    for _ in range(N_RUNS):
+        gc.collect()
+        gc.disable()
+        try:
+            start = default_timer()
+            func()
+            seconds = min(seconds, default_timer() - start)
+        finally:
+            gc.enable()
+    return 1e6 * seconds / n_states
+
+
+def main(argv):
+    """Run the benchmark.
+
+    :param list[str] argv: CLI arguments
+
+    """
+    argparser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    add_data_options(argparser)
+    args = argparser.parse_args(argv)
+    quiet()
+
+    parser, trees = get_parser(args, RSTParser)
+    model = parser._model
+    pipeline = model._clf
+    feat_extractor = model.feat_extractor
+    samples = []
+    for tree in trees:
+        samples.extend(tuple(sample[:3]) + (tree._conll_doc,)
+                       for sample in tree.generate_samples()[1])
+    n_states = len(samples)
+    # warm up the caches of node features and columns
+    feats = feat_extractor.extract_feats_many(samples)
+    ref_scores = pipeline.decision_function(feats)
+    ref_actions = ref_scores.argmax(axis=1)
+
+    print("{:d} parser states, {:d} features, {:d} actions\n".format(
+        n_states, len(pipeline.steps[0][1].vocabulary_),
+        ref_scores.shape[1]))
+    print("{:<10s} {:>10s} {:>8s} {:>11s} {:>11s} {:>11s} {:>11s}".format(
+        "scorer", "max-diff", "agree", "score-1", "score-all", "step-1",
+        "step-all"))
+    print("{:<10s} {:>10s} {:>8s} {:>11.2f} {:>11.2f} {:>11.2f} {:>11.2f}"
+          .format(
+              "sklearn", "-", "-",
+              measure(lambda: [pipeline.decision_function(f)
+                               for f in feats], n_states),
+              measure(lambda: pipeline.decision_function(feats), n_states),
+              measure(lambda: [pipeline.decision_function(
+                  [feat_extractor.extract_feats(*s)]) for s in samples],
+                      n_states),
+              measure(lambda: pipeline.decision_function(
+                  feat_extractor.extract_feats_many(samples)), n_states)))
+    for dtype in (np.float64, np.float32):
+        scorer = model.export(dtype)
+        vocab = scorer.vocab
+        cols = [feat_extractor.extract_cols([s], vocab) for s in samples]
+        all_cols = feat_extractor.extract_cols(samples, vocab)
+        scores = scorer.score(*all_cols)
+        print("{:<10s} {:>10.2e} {:>8.4f} {:>11.2f} {:>11.2f} {:>11.2f}"
+              " {:>11.2f}".format(
+                  np.dtype(dtype).name, np.abs(scores - ref_scores).max(),
+                  np.mean(scores.argmax(axis=1) == ref_actions),
+                  measure(lambda: [scorer.score(*c) for c in cols],
+                          n_states),
+                  measure(lambda: scorer.score(*all_cols), n_states),
+                  measure(lambda: [scorer.score(
+                      *feat_extractor.extract_cols([s], vocab))
+                      for s in samples], n_states),
+                  measure(lambda: scorer.score(
+                      *feat_extractor.extract_cols(samples, vocab)),
+                      n_states)))
+    print("\nColumns are microseconds per state: score-1/score-all score"
+          " precomputed features\none state at a time or all at once;"
+          " step-1/step-all include feature lookup.")
+
+
+##################################################################
+# Main
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- mode: python; coding: utf-8 -*-
+
+"""Compare memory and time of batch and streaming training.
+
+Training corpora of growing size are simulated by reading the first
+documents of the data several times.  Batch training gets all trees as
+a list, whereas streaming training re-reads them from disk in every
+pass.  For each corpus size, the script reports the peak memory
+allocated during training (as traced by `tracemalloc`, which slows
+training down) and the training time, as well as the F1 scores of both
+models on the remaining documents.
+
+Example:
+  python benchmarks/bench_streaming.py data/pcc-dis-bhatia/ data/conll/ \
+    -k 1 2 4
+
+"""
+
+##################################################################
+# Imports
+from __future__ import absolute_import, print_function, unicode_literals
+
+from itertools import islice
+from timeit import default_timer
+import argparse
+import gc
+import sys
+import tracemalloc
+
+from common import (add_data_options, iter_dis_data, measure_parsing, quiet,
+                    read_dis_data, span_f1)
+from rstparser.parser import RSTParser
+
+
+##################################################################
+# Constants
+DFLT_N_TRAIN = 60
+DFLT_REPEATS = [1, 2, 4]
+
+
+##################################################################
+# Classes
+class Corpus(object):
+    """Re-readable corpus of the first documents, repeated several times.
+
+    """
+    def __init__(self, dis_dir, conll_dir, n_docs, n_repeats):
+        """Class constructor.
+
+        :param str dis_dir: directory containing dis files
+        :param str conll_dir: directory containing CoNLL files
+        :param int n_docs: number of documents to read
+        :param int n_repeats: number of times to read them
+
+        """
+        self.dis_dir = dis_dir
+        self.conll_dir = conll_dir
+        self.n_docs = n_docs
+        self.n_repeats = n_repeats
+
+    def __iter__(self):
+        for _ in range(self.n_repeats):
+            for tree in islice(iter_dis_data(self.dis_dir, self.conll_dir),
+                               self.n_docs):
+                yield tree
+
+
+##################################################################
+# Methods
+def measure_training(train):
+    """Measure peak memory and time of training.
+
+    :param callable train: function which trains and returns a parser
+
+    :return: trained parser, peak memory in MB, and seconds
+    :rtype: tuple(RSTParser, float, float)
+
+    """
+    gc.collect()
+    tracemalloc.start()
+    start = default_timer()
+    parser = train()
+    seconds = default_timer() - start
+    peak = tracemalloc.get_traced_memory()[1] / 2.**20
+    tracemalloc.stop()
+    return parser, peak, seconds
+
+
+def main(argv):
+    """Run the benchmark.
+
+    :param list[str] argv: CLI arguments
+
+    """
+    argparser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    argparser.add_argument("-k", "--repeats",
+                           help="numbers of times the training documents"
+                           " are read", type=int, nargs="+",
+                           default=DFLT_REPEATS)
+    add_data_options(argparser, model=False, n_train=DFLT_N_TRAIN)
+    args = argparser.parse_args(argv)
+    quiet()
+
+    test_trees = read_dis_data(args.dis_dir, args.conll_dir)[args.n_train:]
+    print("{:>5s} {:<9s} {:>8s} {:>9s} {:>8s} {:>8s}".format(
+        "docs", "training", "peak MB", "train s", "span-F1", "rel-F1"))
+    for n_repeats in args.repeats:
+        corpus = Corpus(args.dis_dir, args.conll_dir, args.n_train,
+                        n_repeats)
+
+        def train_batch():
+            parser = RSTParser([], [], None)
+            parser.train(list(corpus))
+            return parser
+
+        def train_online():
+            parser = RSTParser([], [], None)
+            parser.train_online(corpus)
+            return parser
+
+        for name, train in (("batch", train_batch),
+                            ("streaming", train_online)):
+            parser, peak, seconds = measure_training(train)
+            pred_trees = measure_parsing(parser, test_trees, 1)[0]
+            print("{:>5d} {:<9s} {:>8.1f} {:>9.1f} {:>8.4f} {:>8.4f}".format(
+                args.n_train * n_repeats, name, peak, seconds,
+                span_f1(test_trees, pred_trees),
+                span_f1(test_trees, pred_trees, 3)))
+
+
+##################################################################
+# Main
+if __name__ == "__main__":
+    main(sys.argv[1:])
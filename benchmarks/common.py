@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+# -*- mode: python; coding: utf-8 -*-
+
+"""Shared helpers for benchmark scripts.
+
+"""
+
+##################################################################
+# Imports
+from __future__ import absolute_import, print_function, unicode_literals
+
+from glob import iglob
+from timeit import default_timer
+import codecs
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from rstparser.conll import CoNLLDoc  # noqa
+from rstparser.node import SpanNode  # noqa
+from rstparser.tree import RSTTree  # noqa
+from rstparser.utils import DFLT_ENCODING, LOGGER  # noqa
+
+
+##################################################################
+# Constants
+DFLT_N_TRAIN = 120
+N_LOADS = 3
+
+
+##################################################################
+# Methods
+def add_data_options(argparser, model=True, n_train=DFLT_N_TRAIN):
+    """Add options for specifying benchmark data.
+
+    :param argparse.ArgumentParser argparser: parser to which new options
+      should be added
+    :param bool model: add an option for a trained model (benchmarks
+      which always train their own models do not need it)
+    :param int n_train: default number of training documents
+
+    """
+    if model:
+        argparser.add_argument("-m", "--model",
+                               help="path to a trained model (a new model"
+                               " is trained on the first part of the data"
+                               " if omitted)")
+    argparser.add_argument("--n-train",
+                           help="number of documents to train on if no"
+                           " model is given", type=int, default=n_train)
+    argparser.add_argument("dis_dir",
+                           help="directory containing files with RST trees"
+                           " in dis format")
+    argparser.add_argument("conll_dir",
+                           help="directory containing syntactic parse trees"
+                           " in CoNLL format")
+
+
+def iter_dis_data(dis_dir, conll_dir):
+    """Read RST trees and their CoNLL documents one at a time.
+
+    :param str dis_dir: path to the directory containing dis files
+    :param str conll_dir: path to the directoty containing CoNLL files
+
+    :return: iterator over RST trees sorted by file name
+    :rtype: iterator[RSTTree]
+
+    """
+    for dis_fname in sorted(iglob(os.path.join(dis_dir, "*.dis"))):
+        conll_fname = os.path.join(
+            conll_dir,
+            os.path.splitext(os.path.basename(dis_fname))[0] + ".conll"
+        )
+        if not os.path.exists(conll_fname):
+            continue
+        with codecs.open(conll_fname, 'r', DFLT_ENCODING) as ifile:
+            conll_doc = CoNLLDoc(ifile)
+        with codecs.open(dis_fname, 'r', DFLT_ENCODING) as ifile:
+            yield RSTTree(ifile.read(), conll_doc)
+
+
+def read_dis_data(dis_dir, conll_dir):
+    """Read RST trees and their CoNLL documents.
+
+    :param str dis_dir: path to the directory containing dis files
+    :param str conll_dir: path to the directoty containing CoNLL files
+
+    :return: list of RST trees sorted by file name
+    :rtype: list[RSTTree]
+
+    """
+    return list(iter_dis_data(dis_dir, conll_dir))
+
+
+def get_parser(args, parser_cls, **kwargs):
+    """Load or train a parser for benchmarking.
+
+    :param argparse.Namespace args: parsed command-line arguments
+    :param type parser_cls: class of the parser to create
+    :param dict kwargs: additional arguments of the parser's constructor
+
+    :return: parser and the RST trees which were not used for training
+    :rtype: tuple
+
+    """
+    trees = read_dis_data(args.dis_dir, args.conll_dir)
+    if args.model:
+        return parser_cls([], [], args.model, **kwargs), trees
+    parser = parser_cls([], [], None, **kwargs)
+    parser.train(trees[:args.n_train])
+    return parser, trees[args.n_train:]
+
+
+def get_size(path):
+    """Get the size of a file or of all files in a directory.
+
+    :param str path: path to the file or directory
+
+    :return: size in MB
+    :rtype: float
+
+    """
+    if os.path.isdir(path):
+        size = sum(os.path.getsize(os.path.join(path, fname))
+                   for fname in os.listdir(path))
+    else:
+        size = os.path.getsize(path)
+    return size / 2.**20
+
+
+def load(mpath, parser_cls, n_loads=N_LOADS):
+    """Load a model and measure its size, load time, and memory.
+
+    :param str mpath: path to the model
+    :param type parser_cls: class of the parser to create
+    :param int n_loads: number of loads (the fastest one is reported)
+
+    :return: loaded parser, size in MB, load time in milliseconds, and
+      MB allocated by the loaded model
+    :rtype: tuple(RSTParser, float, float, float)
+
+    """
+    seconds = float("inf")
+    for _ in range(n_loads):
+        start = default_timer()
+        parser_cls(mpath=mpath)
+        seconds = min(seconds, default_timer() - start)
+    tracemalloc.start()
+    try:
+        parser = parser_cls(mpath=mpath)
+        memory, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return parser, get_size(mpath), 1e3 * seconds, memory / 2.**20
+
+
+def get_edus(rst_tree):
+    """Create parser input from the EDUs of an RST tree.
+
+    :param RSTTree rst_tree: gold RST tree
+
+    :return: list of fresh EDU nodes
+    :rtype: list[SpanNode]
+
+    """
+    edus = []
+    for node in rst_tree.get_edu_nodes():
+        edu = SpanNode("")
+        edu.nucedu = node.nucedu
+        edu.nucspan = node.nucspan
+        edu.eduspan = node.eduspan
+        edu.text = list(node.text)
+        edus.append(edu)
+    return edus
+
+
+def get_brackets(node):
+    """Get labeled spans of all non-root nodes of a tree.
+
+    :param SpanNode node: root of the tree
+
+    :return: set of (EDU span, nuclearity, relation) triples
+    :rtype: set
+
+    """
+    brackets = set()
+    nodes = [node]
+    while nodes:
+        node = nodes.pop()
+        if node.pnode is not None or node.prop not in (None, "Root"):
+            brackets.add((node.eduspan, node.prop, node.relation))
+        nodes.extend(n for n in (node.lnode, node.rnode) if n is not None)
+    return brackets
+
+
+def span_f1(gold_trees, pred_trees, level=1):
+    """Compute micro-averaged F1 score of predicted brackets.
+
+    :param list[RSTTree] gold_trees: gold RST trees
+    :param list[SpanNode] pred_trees: roots of predicted trees
+    :param int level: number of bracket elements to compare (1 - spans,
+      2 - nuclearity, 3 - relations)
+
+    :return: F1 score
+    :rtype: float
+
+    """
+    n_gold = n_pred = n_correct = 0
+    for gold_tree, pred_tree in zip(gold_trees, pred_trees):
+        gold = set(b[:level] for b in get_brackets(gold_tree.tree))
+        pred = set(b[:level] for b in get_brackets(pred_tree))
+        n_gold += len(gold)
+        n_pred += len(pred)
+        n_correct += len(gold & pred)
+    if n_correct == 0:
+        return 0.
+    precision = n_correct / float(n_pred)
+    recall = n_correct / float(n_gold)
+    return 2 * precision * recall / (precision + recall)
+
+
+def measure_parsing(parser, test_trees, n_runs=3):
+    """Parse test documents and measure the time per parser step.
+
+    :param RSTParser parser: trained parser
+    :param list[RSTTree] test_trees: gold trees of the test documents
+    :param int n_runs: number of runs (the fastest one is reported)
+
+    :return: predicted trees and microseconds per step (best of several
+      runs)
+    :rtype: tuple(list[SpanNode], float)
+
+    """
+    docs = [(get_edus(t), t._conll_doc) for t in test_trees]
+    # every EDU is shifted once, and all but one nodes are reduced
+    n_steps = sum(2 * len(edus) - 1 for edus, _ in docs)
+    seconds = float("inf")
+    for _ in range(n_runs):
+        gc.collect()
+        gc.disable()
+        try:
+            start = default_timer()
+            pred_trees = [parser.parse(edus, conll_doc)
+                          for edus, conll_doc in docs]
+            seconds = min(seconds, default_timer() - start)
+        finally:
+            gc.enable()
+    return pred_trees, 1e6 * seconds / n_steps
+
+
+def quiet():
+    """Suppress informational log messages of the parser.
+
+    """
+    LOGGER.setLevel("ERROR")
+    for handler_i in LOGGER.handlers:
+        handler_i.setLevel("ERROR")
@@ -5,6 +5,7 @@
 # Imports
 from __future__ import absolute_import, print_function, unicode_literals
 
+from collections import deque
 
 from .datastructure import SpanNode
 from .utils import extractrelation
@@ -18,10 +19,10 @@ def BFT(tree):
     :type tree: SpanNode instance
     :param tree: an general RST tree
     """
-    queue = [tree]
+    queue = deque([tree])
     bft_nodelist = []
     while queue:
-        node = queue.pop(0)
+        node = queue.popleft()
         bft_nodelist.append(node)
         queue += node.nodelist
     return bft_nodelist
@@ -33,10 +34,10 @@ def BFTbin(tree):
     :type tree: SpanNode instance
     :param tree: an binary RST tree
     """
-    queue = [tree]
+    queue = deque([tree])
     bft_nodelist = []
     while queue:
-        node = queue.pop(0)
+        node = queue.popleft()
         bft_nodelist.append(node)
         if node.lnode is not None:
             queue.append(node.lnode)
@@ -148,11 +149,11 @@ def buildtree(text):
     """
     tokens = text.strip().replace('//TT_ERR','').replace('\n','').replace('(', ' ( ').replace(')', ' ) ').split()
     # print 'tokens = {}'.format(tokens)
-    queue = processtext(tokens)
+    queue = deque(processtext(tokens))
     # print 'queue = {}'.format(queue)
     stack = []
     while queue:
-        token = queue.pop(0)
+        token = queue.popleft()
         if token == ')':
             # If ')', start processing
             content = [] # Content in the stack
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# -*- mode: python; coding: utf-8 -*-
+
+"""Bounded caches used by the parser.
+
+"""
+
+##################################################################
+# Imports
+from __future__ import absolute_import, print_function, unicode_literals
+
+from collections import OrderedDict
+from threading import Lock
+import hashlib
+
+
+##################################################################
+# Constants
+DFLT_CACHE_SIZE = 100000
+
+
+##################################################################
+# Classes
+class LRUCache(object):
+    """Thread-safe mapping of bounded size with least-recently-used eviction.
+
+    """
+    def __init__(self, max_size=DFLT_CACHE_SIZE):
+        """Class constructor.
+
+        :param int max_size: maximum number of entries
+
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    @property
+    def hit_rate(self):
+        """Get the share of successful lookups.
+
+        :return: number of hits divided by the number of lookups
+        :rtype: float
+
+        """
+        n_lookups = self.hits + self.misses
+        return self.hits / float(n_lookups) if n_lookups else 0.
+
+    def get(self, key, default=None):
+        """Look up an entry and mark it as recently used.
+
+        :param key: key of the entry
+        :param default: value to return if the key is missing
+
+        :return: cached value or default
+
+        """
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Add an entry, evicting the least recently used one if needed.
+
+        :param key: key of the entry
+        :param value: value of the entry
+
+        """
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """Remove all entries and reset counters.
+
+        """
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+
+class PrefixCache(object):
+    """Checkpoints of parse states keyed by the EDU prefixes of documents.
+
+    A checkpoint holds the actions performed up to and including the
+    shift of the k-th EDU.  Since every decision only looks at the first
+    EDU of the queue, these actions depend only on the first k EDUs, and
+    a document with the same prefix can resume parsing from there.
+
+    Note that the struct features also look at the number of EDUs in the
+    document.  By default, checkpoints are therefore only reused for
+    documents with the same number of EDUs, so that a resumed parse is
+    always identical to a fresh one.  With `exact` switched off,
+    documents of different lengths share checkpoints, and resumed
+    decisions are those made for the previous length of the document.
+
+    """
+    def __init__(self, max_size=DFLT_CACHE_SIZE, exact=True):
+        """Class constructor.
+
+        :param int max_size: maximum number of checkpoints to keep
+        :param bool exact: only reuse checkpoints of documents with the
+          same number of EDUs (if False, resumed parses may differ from
+          fresh ones)
+
+        """
+        self.exact = exact
+        self.hits = 0
+        self.misses = 0
+        self._checkpoints = LRUCache(max_size)
+        self._lock = Lock()
+
+    def get_prefix_keys(self, queue, conll_doc):
+        """Compute rolling hashes of all EDU prefixes of a document.
+
+        :param list[SpanNode] queue: EDUs of the document
+        :param CoNLLDoc conll_doc: CoNLL document
+
+        :return: keys of prefixes consisting of 1, 2, ..., n EDUs
+        :rtype: list[bytes]
+
+        """
+        tokendict = conll_doc.tokendict
+        digest = b""
+        if self.exact:
+            digest = "{:d}".format(len(queue)).encode("utf-8")
+        keys = []
+        for edu in queue:
+            hasher = hashlib.sha1(digest)
+            hasher.update("{!r}:{!r}".format(edu.eduspan,
+                                             edu.nucedu).encode("utf-8"))
+            for i in edu.text:
+                tok = tokendict[i]
+                hasher.update("{!r}".format((
+                    i, tok.sidx, tok.word, tok.lemma, tok.pos,
+                    tok.deplabel, tok.hidx)).encode("utf-8"))
+            digest = hasher.digest()
+            keys.append(digest)
+        return keys
+
+    def lookup(self, keys):
+        """Find the checkpoint with the longest matching prefix.
+
+        :param list[bytes] keys: prefix keys of the document
+
+        :return: number of shifted EDUs and actions performed up to the
+          checkpoint (0 and an empty list if nothing was found)
+        :rtype: tuple(int, list[tuple])
+
+        """
+        for n_shifts in range(len(keys), 0, -1):
+            checkpoint = self._checkpoints.get(keys[n_shifts - 1])
+            if checkpoint is not None:
+                actions, n_actions = checkpoint
+                with self._lock:
+                    self.hits += 1
+                return n_shifts, list(actions[:n_actions])
+        with self._lock:
+            self.misses += 1
+        return 0, []
+
+    def store(self, keys, actions):
+        """Save checkpoints after every shift of a parse.
+
+        :param list[bytes] keys: prefix keys of the document
+        :param list[tuple] actions: complete action sequence of the parse
+
+        """
+        actions = tuple(actions)
+        n_shifts = 0
+        for i, action in enumerate(actions):
+            if action[0] == "shift":
+                self._checkpoints.put(keys[n_shifts], (actions, i + 1))
+                n_shifts += 1
+
+    def clear(self):
+        """Remove all checkpoints and reset counters.
+
+        """
+        self._checkpoints.clear()
+        with self._lock:
+            self.hits = self.misses = 0
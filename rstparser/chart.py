@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+# -*- mode: python; coding: utf-8 -*-
+
+"""Chart-based RST parser, which finds the globally best binary tree
+by dynamic programming over EDU spans.
+
+"""
+
+##################################################################
+# Imports
+from __future__ import absolute_import, print_function, unicode_literals
+
+from collections import deque
+
+import numpy as np
+
+from .exceptions import ActionError, ParseError
+from .model import log_softmax
+from .parser import SHIFT_ACTION, RSTParser
+
+
+##################################################################
+# Constants
+DFLT_MAX_WIDTH = None
+
+
+##################################################################
+# Class
+class ChartParser(RSTParser):
+    """CKY-style rhetorical structure parser.
+
+    Every merge of two adjacent spans is scored with the trained
+    shift-reduce model as the log-probability of the best reduce action
+    in the state where the left span is the second and the right span is
+    the first element on the stack.  The parser then finds the binary
+    tree with the maximum sum of merge scores.
+
+    If `max_width` is set, the chart is only filled for spans of at most
+    that many EDUs, and the document is assembled from such spans by
+    merging them left to right, which keeps the number of scored merges
+    linear in the number of EDUs.
+
+    """
+    def __init__(self, queue=None, stack=None, mpath=None,
+                 max_width=DFLT_MAX_WIDTH):
+        """Class constructor.
+
+        :param list queue: EDUs to be processed
+        :param list stack: currently processed EDUs
+        :param str mpath: path to pretrained model
+        :param max_width: maximum number of EDUs in a chart cell (None
+          means no limit)
+        :type max_width: int or None
+
+        """
+        super(ChartParser, self).__init__(queue, stack, mpath)
+        if max_width is not None and max_width < 2:
+            raise ValueError(
+                "Maximum span width should be at least 2: {!r}".format(
+                    max_width)
+            )
+        self.max_width = max_width
+
+    def parse(self, queue, conll_doc):
+        """Construst an RST tree from a list of EDU nodes.
+
+        :param list[SpanNode] queue: list of input EDUs
+        :param CoNLLDoc conll_doc: list of input EDUs
+
+        """
+        n_edus = len(queue)
+        if n_edus == 0:
+            raise ParseError("Illegal stack/queue status")
+        if not self._model.legal_mask(2, 0).any():
+            raise ActionError("No action could be performed.")
+        width = n_edus
+        if self.max_width is not None:
+            width = min(width, self.max_width)
+        chart = self._fill_chart(queue, conll_doc, width)
+        if width == n_edus:
+            actions = self._get_cell_actions(chart, 0, n_edus - 1)
+        else:
+            actions = self._get_spine_actions(queue, conll_doc, chart, width)
+        queue = deque(queue)
+        stack = []
+        for action in actions:
+            self._operate(queue, stack, action)
+        with self._stats_lock:
+            self.stats["parsed"] += 1
+        return stack[0]
+
+    def _fill_chart(self, queue, conll_doc, width):
+        """Compute the best binary trees for all spans up to given width.
+
+        :param list[SpanNode] queue: list of input EDUs
+        :param CoNLLDoc conll_doc: CoNLL document
+        :param int width: maximum number of EDUs in a span
+
+        :return: mapping from spans (first and last EDU index) to 4-tuples
+          of tree score, tree root, split point, and reduce action index
+        :rtype: dict
+
+        """
+        n_edus = len(queue)
+        chart = {(i, i): (0., edu, -1, -1) for i, edu in enumerate(queue)}
+        for w in range(2, width + 1):
+            samples = []
+            prior_scores = []
+            for i in range(n_edus - w + 1):
+                j = i + w - 1
+                queue_node = queue[j + 1] if j + 1 < n_edus else None
+                for k in range(i, j):
+                    lscore, lnode, _, _ = chart[i, k]
+                    rscore, rnode, _, _ = chart[k + 1, j]
+                    samples.append((rnode, lnode, queue_node, conll_doc))
+                    prior_scores.append(lscore + rscore)
+            merge_scores, merge_actions = self._score_merges(samples)
+            scores = (np.array(prior_scores) + merge_scores).reshape(-1, w - 1)
+            splits = scores.argmax(axis=1)
+            for i, split in enumerate(splits):
+                j = i + w - 1
+                k = i + split
+                idx = i * (w - 1) + split
+                action_idx = merge_actions[idx]
+                node = self._merge(chart[i, k][1], chart[k + 1, j][1],
+                                   self._model.actions[action_idx][1])
+                chart[i, j] = (scores[i, split], node, k, action_idx)
+        return chart
+
+    def _get_spine_actions(self, queue, conll_doc, chart, width):
+        """Assemble the best tree from chart cells merged left to right.
+
+        :param list[SpanNode] queue: list of input EDUs
+        :param CoNLLDoc conll_doc: CoNLL document
+        :param dict chart: chart with the best trees of bounded width
+        :param int width: maximum number of EDUs in a chart cell
+
+        :return: sequence of shift-reduce actions producing the tree
+        :rtype: list[tuple]
+
+        """
+        n_edus = len(queue)
+        # best trees covering the first j EDUs
+        prefixes = {0: (0., None, -1, -1)}
+        for j in range(1, n_edus + 1):
+            start = max(0, j - width)
+            queue_node = queue[j] if j < n_edus else None
+            samples = []
+            prior_scores = []
+            for i in range(max(1, start), j):
+                pscore, pnode, _, _ = prefixes[i]
+                cscore, cnode, _, _ = chart[i, j - 1]
+                samples.append((cnode, pnode, queue_node, conll_doc))
+                prior_scores.append(pscore + cscore)
+            best = (-np.inf, None, -1, -1)
+            if samples:
+                merge_scores, merge_actions = self._score_merges(samples)
+                scores = np.array(prior_scores) + merge_scores
+                idx = int(scores.argmax())
+                i = max(1, start) + idx
+                action_idx = merge_actions[idx]
+                node = self._merge(prefixes[i][1], chart[i, j - 1][1],
+                                   self._model.actions[action_idx][1])
+                best = (scores[idx], node, i, action_idx)
+            if start == 0 and chart[0, j - 1][0] >= best[0]:
+                best = (chart[0, j - 1][0], chart[0, j - 1][1], 0, -1)
+            prefixes[j] = best
+        # collect segments from right to left
+        segments = []
+        j = n_edus
+        while j > 0:
+            _, _, i, action_idx = prefixes[j]
+            segments.append((i, j - 1, action_idx))
+            j = i
+        actions = []
+        for i, j, action_idx in reversed(segments):
+            actions.extend(self._get_cell_actions(chart, i, j))
+            if i > 0:
+                actions.append(self._model.actions[action_idx])
+        return actions
+
+    def _get_cell_actions(self, chart, i, j):
+        """Get shift-reduce actions which produce the best tree of a cell.
+
+        :param dict chart: filled chart
+        :param int i: index of the first EDU of the span
+        :param int j: index of the last EDU of the span
+
+        :return: sequence of shift-reduce actions
+        :rtype: list[tuple]
+
+        """
+        actions = []
+        todo = [(i, j, False)]
+        while todo:
+            i, j, expanded = todo.pop()
+            if i == j:
+                actions.append(SHIFT_ACTION)
+            elif expanded:
+                actions.append(self._model.actions[chart[i, j][-1]])
+            else:
+                k = chart[i, j][2]
+                todo.extend(((i, j, True), (k + 1, j, False), (i, k, False)))
+        return actions
+
+    def _score_merges(self, samples):
+        """Score merges of adjacent spans in one batch.
+
+        :param list[tuple] samples: parser states in which the spans to
+          merge are the first two elements on the stack
+
+        :return: log-probabilities of the best reduce actions and the
+          indices of these actions
+        :rtype: tuple(np.array, np.array)
+
+        """
+        scores = log_softmax(self._model.decision_function(samples))
+        scores[:, ~self._model.legal_mask(2, 0)] = -np.inf
+        best = scores.argmax(axis=1)
+        return scores[np.arange(len(samples)), best], best
@@ -5,9 +5,125 @@
 # Imports
 from __future__ import absolute_import, print_function, unicode_literals
 
+from threading import Lock
+
+from six import iteritems
+import numpy as np
+
 
 ##################################################################
 # Class
+class Vocabulary(object):
+    """Thread-safe interning of strings as consecutive integer ids.
+
+    """
+    def __init__(self):
+        """Class constructor.
+
+        """
+        # interned strings in the order of their ids
+        self.strings = []
+        self._str2id = {}
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self.strings)
+
+    def __contains__(self, string):
+        return string in self._str2id
+
+    def intern(self, string):
+        """Get id of a string, adding the string if it is new.
+
+        :param str string: string to look up
+
+        :return: id of the string
+        :rtype: int
+
+        """
+        try:
+            return self._str2id[string]
+        except KeyError:
+            with self._lock:
+                idx = self._str2id.get(string)
+                if idx is None:
+                    idx = len(self.strings)
+                    self.strings.append(string)
+                    self._str2id[string] = idx
+                return idx
+
+    def get(self, string, default=-1):
+        """Get id of a string without adding it.
+
+        :param str string: string to look up
+        :param int default: value to return for unknown strings
+
+        :return: id of the string or default
+        :rtype: int
+
+        """
+        return self._str2id.get(string, default)
+
+
+class TokenTable(object):
+    """Parallel arrays of token attributes indexed by global token index.
+
+    Lemmas (lowercased), POS tags, and dependency labels are stored as
+    ids from the vocabularies `lemma_vocab`, `pos_vocab`, and
+    `deplabel_vocab` of the table.  These vocabularies are scoped to the
+    document, so that they are freed with it instead of growing with
+    every parsed text.  Missing tokens and attributes are marked with -1.
+
+    """
+    def __init__(self, tokendict):
+        """Class constructor.
+
+        :param dict tokendict: mapping from global token indices to
+          CoNLL tokens
+
+        """
+        self.n_tokens = len(tokendict)
+        self.lemma_vocab = Vocabulary()
+        self.pos_vocab = Vocabulary()
+        self.deplabel_vocab = Vocabulary()
+        n = max(tokendict) + 1 if tokendict else 0
+        attrs = np.full((5, n), -1, dtype=np.int32)
+        for gidx, tok in iteritems(tokendict):
+            attrs[:, gidx] = (
+                tok.sidx,
+                self.lemma_vocab.intern(tok.lemma.lower()),
+                self.pos_vocab.intern(tok.pos),
+                -1 if tok.deplabel is None else self.deplabel_vocab.intern(
+                    tok.deplabel
+                ),
+                -1 if tok.hidx is None else tok.hidx
+            )
+        self.sidx, self.lemma, self.pos, self.deplabel, self.hidx = attrs
+        # mapping from EDU index to the unique lemma ids of its tokens
+        self._edu_lemmas = {}
+
+    def __len__(self):
+        return len(self.sidx)
+
+    def edu_lemmas(self, edudict, eduidx):
+        """Get unique lemma ids of an EDU.
+
+        :param dict edudict: mapping from EDU indices to global token
+          indices
+        :param int eduidx: index of the EDU
+
+        :rtype: np.array
+
+        """
+        try:
+            return self._edu_lemmas[eduidx]
+        except KeyError:
+            lemmas = self._edu_lemmas[eduidx] = np.unique(
+                self.lemma[edudict[eduidx]]
+            )
+            return lemmas
+
+
 class CoNLLDoc(object):
     """CoNLL document.
 
@@ -22,9 +138,27 @@ class CoNLLDoc(object):
         self.tokendict = {}
         # EDU dict
         self.edudict = {}
+        # Cached per-document feature information (see DocFeatures)
+        self.doc_feats = None
+        self._token_table = None
         if ifile is not None:
             self._parse(ifile)
 
+    @property
+    def token_table(self):
+        """Get array-backed representation of the tokens.
+
+        The table is built on first access and rebuilt whenever tokens
+        have been added to the document since.
+
+        :rtype: TokenTable
+
+        """
+        table = getattr(self, "_token_table", None)
+        if table is None or table.n_tokens != len(self.tokendict):
+            table = self._token_table = TokenTable(self.tokendict)
+        return table
+
     def _parse(self, ifile):
         sidx = 0
         for iline in ifile:
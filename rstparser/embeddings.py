@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- mode: python; coding: utf-8 -*-
+
+"""Memory-mapped word embeddings.
+
+An embedding matrix is stored as a NumPy file (`.npy`) whose rows are
+the vectors of the lemmas listed (one per line) in a text file with the
+same name and the extension `.vocab`.  The matrix is memory-mapped, so
+that lookups do not copy it into the process and processes which use
+the same file share it through the page cache.
+
+"""
+
+##################################################################
+# Imports
+from __future__ import absolute_import, print_function, unicode_literals
+
+import codecs
+import os
+
+import numpy as np
+
+from .utils import DFLT_ENCODING
+
+
+##################################################################
+# Constants
+VOCAB_EXT = ".vocab"
+
+
+##################################################################
+# Classes
+class Embeddings(object):
+    """Read-only lookup of lemma vectors from a memory-mapped matrix.
+
+    Only the path is pickled; the matrix and the index of lemmas are
+    dropped by :meth:`reset` and reopened by :meth:`restore`.
+
+    """
+    def __init__(self, path):
+        """Class constructor.
+
+        :param str path: path to the `.npy` file with the embedding matrix
+
+        """
+        self.path = os.path.abspath(path)
+        self._matrix = None
+        self._index = None
+        self.restore()
+
+    @property
+    def dim(self):
+        """Get dimension of the vectors.
+
+        :rtype: int
+
+        """
+        return self._matrix.shape[1]
+
+    def __len__(self):
+        return self._matrix.shape[0]
+
+    def __contains__(self, lemma):
+        return lemma in self._index
+
+    def reset(self):
+        """Close the memory map and drop the index of lemmas.
+
+        """
+        self._matrix = None
+        self._index = None
+
+    def restore(self):
+        """Open the memory map and read the index of lemmas.
+
+        :raises ValueError: if the matrix and the index do not match
+
+        """
+        if self._matrix is not None:
+            return
+        # a plain array view of the map avoids the overhead of creating
+        # memmap objects on every lookup
+        self._matrix = np.asarray(np.load(self.path, mmap_mode="r"))
+        with codecs.open(self.vocab_path(self.path), 'r',
+                         DFLT_ENCODING) as ifile:
+            lemmas = [iline.rstrip("\n") for iline in ifile]
+        if self._matrix.ndim != 2 or len(lemmas) != self._matrix.shape[0]:
+            raise ValueError(
+                "Embedding matrix {!r} does not match its {:d}"
+                " lemmas".format(self.path, len(lemmas)))
+        self._index = dict((lemma, i) for i, lemma in enumerate(lemmas))
+
+    def mean(self, lemmas):
+        """Average the vectors of the known lemmas.
+
+        :param lemmas: lemmas whose vectors should be averaged
+        :type lemmas: iterable[str]
+
+        :return: average vector or None if no lemma is known
+        :rtype: np.array or None
+
+        """
+        index = self._index
+        rows = [index[lemma] for lemma in lemmas if lemma in index]
+        if not rows:
+            return None
+        rows.sort()
+        return self._matrix[rows].mean(axis=0, dtype=np.float64)
+
+    @staticmethod
+    def vocab_path(path):
+        """Get path of the lemma index belonging to an embedding matrix.
+
+        :param str path: path to the `.npy` file
+
+        :rtype: str
+
+        """
+        return os.path.splitext(path)[0] + VOCAB_EXT
+
+    @classmethod
+    def save(cls, path, lemmas, matrix):
+        """Store embeddings in the memory-mappable format.
+
+        :param str path: path to the `.npy` file to create
+        :param list[str] lemmas: lemmas of the matrix rows
+        :param np.array matrix: embedding matrix
+
+        :return: embeddings opened from the new files
+        :rtype: Embeddings
+
+        """
+        with open(path, "wb") as ofile:
+            np.save(ofile, np.asarray(matrix, dtype=np.float32))
+        with codecs.open(cls.vocab_path(path), 'w', DFLT_ENCODING) as ofile:
+            for lemma in lemmas:
+                ofile.write(lemma + "\n")
+        return cls(path)
+
+    @classmethod
+    def from_text(cls, ifname, path):
+        """Convert embeddings from the text format of word2vec or GloVe.
+
+        Words are lowercased (like the lemmas of the features), and only
+        the first vector of every lowercased word is kept.
+
+        :param str ifname: path to the text file
+        :param str path: path to the `.npy` file to create
+
+        :return: converted embeddings
+        :rtype: Embeddings
+
+        """
+        lemmas = []
+        vectors = []
+        seen = set()
+        with codecs.open(ifname, 'r', DFLT_ENCODING) as ifile:
+            for iline in ifile:
+                fields = iline.rstrip().split(' ')
+                if len(fields) <= 2:
+                    # header line of word2vec files
+                    continue
+                lemma = fields[0].lower()
+                if lemma in seen:
+                    continue
+                seen.add(lemma)
+                lemmas.append(lemma)
+                vectors.append([float(v) for v in fields[1:]])
+        return cls.save(path, lemmas, np.array(vectors, dtype=np.float32))
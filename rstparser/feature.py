@@ -5,18 +5,695 @@
 # Imports
 from __future__ import absolute_import, print_function, unicode_literals
 
-from .utils import LOGGER, getgrams
+from collections import OrderedDict
+from functools import partial
+from itertools import count
+from timeit import default_timer
+
+from scipy.sparse import csr_matrix
+from six import iteritems, itervalues, string_types
+from sklearn.feature_extraction import FeatureHasher
+import numpy as np
+
+from .cache import DFLT_CACHE_SIZE, LRUCache
+from .utils import LOGGER
+
+
+##################################################################
+# Variables and Constants
+# positions of the nodes whose features are extracted
+TOP1 = 0
+TOP2 = 1
+FIRST = 2
+ROLE_NAMES = ("Top1-Stack", "Top2-Stack", "First-Queue")
+DISREP_NAMES = ("Top1Span", "Top2Span", "FirstSpan")
+# minimum number of states of a document for which array-based
+# extraction pays off
+MIN_VECTOR_BATCH = 16
+# unique ids of documents in span caches
+_DOC_IDS = count()
+# registry of feature groups (in the order of their extraction)
+FEATURE_GROUPS = OrderedDict()
+# groups which are extracted by default
+DFLT_FEATURE_GROUPS = ("status", "lex", "struct", "edu", "distrib", "sent")
+# names of the embedding features of each node position and dimension
+_EMB_NAMES = {}
+# separator of the parts of tuple feature names for hashing (tokens of
+# CoNLL files never contain tabs)
+HASH_SEP = "\t"
+
+
+##################################################################
+# Methods
+def register_feature_group(name, extract, per_node=True, extract_many=None,
+                           cols=None):
+    """Add a feature group to the registry.
+
+    Groups which are not among `DFLT_FEATURE_GROUPS` have to be enabled
+    explicitly (see :attr:`FeatureExtractor.groups`).
+
+    :param str name: unique name of the group
+    :param extract: function which adds the features of a state to a
+      dict (or the name of such a method of FeatureExtractor)
+    :type extract: callable or str
+    :param bool per_node: whether the features only depend on a single
+      node
+    :param extract_many: optional function which adds the features of
+      multiple nodes (or states) of the same document at once
+    :type extract_many: callable or str or None
+    :param cols: optional function which looks up the known feature
+      columns of a node (or state) directly in the frozen vocabulary
+    :type cols: callable or str or None
+
+    :return: registered group
+    :rtype: FeatureGroup
+
+    :raises ValueError: if a group with the same name already exists
+
+    """
+    if name in FEATURE_GROUPS:
+        raise ValueError("Feature group {!r} already exists".format(name))
+    group = FEATURE_GROUPS[name] = FeatureGroup(name, extract, per_node,
+                                                extract_many, cols)
+    return group
+
+
+def _lookup_node_cols(extract, feats, role, node, conll, doc_feats, doclen,
+                      vocab):
+    """Look up feature columns of a node from its extracted features.
+
+    This is the fallback of per-node groups without a `cols` function.
+
+    :param callable extract: extraction function of the group
+    :param dict feats: target mapping from columns to values
+    :param int role: position of the node (TOP1, TOP2, or FIRST)
+    :param SpanNode node: node whose features should be extracted
+    :param CoNLLDoc conll: conll document
+    :param DocFeatures doc_feats: cached information of the document
+    :param int doclen: number of EDUs in the document
+    :param FrozenVocabulary vocab: column indices of known features
+
+    """
+    nodes = [None, None, None]
+    nodes[role] = node
+    group_feats = {}
+    extract(group_feats, *nodes, conll=conll)
+    for name, val in iteritems(group_feats):
+        feats[vocab.get(name)] = val
+
+
+def _lookup_state_cols(extract, feats, sample, doc_feats, doclen, vocab):
+    """Look up feature columns of a state from its extracted features.
+
+    This is the fallback of state groups without a `cols` function.
+
+    :param callable extract: extraction function of the group
+    :param dict feats: target mapping from columns to values
+    :param tuple sample: parser state
+    :param DocFeatures doc_feats: cached information of the document
+    :param int doclen: number of EDUs in the document
+    :param FrozenVocabulary vocab: column indices of known features
+
+    """
+    group_feats = {}
+    extract(group_feats, *sample)
+    for name, val in iteritems(group_feats):
+        feats[vocab.get(name)] = val
 
 
 ##################################################################
 # Class
-class FeatureExtractor(object):
+class DocFeatures(object):
+    """Per-document information about tokens and EDUs.
+
+    Lowercased lemmas, POS tags, and sentence indices of all tokens as
+    well as the lemma bags of all EDUs are computed once per document,
+    so that per-step feature extraction only combines these pieces.
+    Tokens and EDUs which are added to the document later (e.g., during
+    incremental parsing) are processed on first access.
+
+    """
+    def __init__(self, conll):
+        """Class constructor.
+
+        :param conll: document whose tokens and EDUs should be processed
+        :type conll: CoNLLDoc or RSTTree
+
+        """
+        self.doc_id = next(_DOC_IDS)
+        self._tokendict = conll.tokendict
+        self._edudict = conll.edudict
+        # mapping from global token index to (lemma, POS tag, sentence)
+        self._tokens = {}
+        # mapping from EDU index to the set of its lemmas
+        self._edu_lemmas = {}
+        for gidx in self._tokendict:
+            self._add_token(gidx)
+        for eduidx in self._edudict:
+            self._add_edu(eduidx)
+
+    @classmethod
+    def get(cls, conll):
+        """Get (and create if necessary) the cached information of a document.
+
+        :param conll: document whose information should be returned
+        :type conll: CoNLLDoc or RSTTree
+
+        :return: per-document feature information
+        :rtype: DocFeatures
+
+        """
+        doc_feats = getattr(conll, "doc_feats", None)
+        if doc_feats is None:
+            doc_feats = conll.doc_feats = cls(conll)
+        return doc_feats
+
+    def token(self, gidx):
+        """Get lowercased lemma, POS tag, and sentence index of a token.
+
+        :param int gidx: global index of the token
+
+        :rtype: tuple(str, str, int)
+
+        """
+        try:
+            return self._tokens[gidx]
+        except KeyError:
+            return self._add_token(gidx)
+
+    def lemmas(self, eduidx):
+        """Get the set of lowercased lemmas of an EDU.
+
+        :param int eduidx: index of the EDU
+
+        :rtype: frozenset[str]
+
+        """
+        try:
+            return self._edu_lemmas[eduidx]
+        except KeyError:
+            return self._add_edu(eduidx)
+
+    def grams(self, text):
+        """Generate boundary unigrams and bigrams of a span.
+
+        This is equivalent to :func:`rstparser.utils.getgrams`, but only
+        looks up the precomputed boundary tokens.
+
+        :param text: global token indices of the span
+        :type text: list[int] or range
+
+        :rtype: list[str]
+
+        """
+        n = len(text)
+        grams = []
+        if n >= 1:
+            first = self.token(text[0])
+            last = self.token(text[-1])
+            grams.append(first[0])
+            grams.append(last[0])
+            grams.append(first[1])
+            grams.append(last[1])
+        if n >= 2:
+            grams.append(first[0] + ' ' + self.token(text[1])[0])
+            grams.append(self.token(text[-2])[0] + ' ' + last[0])
+        return grams
+
+    def _add_token(self, gidx):
+        tok = self._tokendict[gidx]
+        ret = self._tokens[gidx] = (tok.lemma.lower(), tok.pos, tok.sidx)
+        return ret
+
+    def _add_edu(self, eduidx):
+        ret = self._edu_lemmas[eduidx] = frozenset(
+            self.token(gidx)[0] for gidx in self._edudict[eduidx]
+        )
+        return ret
+
+
+class FrozenVocabulary(object):
+    """Column indices of the features seen at training time.
+
+    Indices of templated features (n-grams and lemmas) are stored per
+    template, so that an unseen feature value is dropped after a single
+    string lookup without building its feature name.
+
+    """
+    def __init__(self, vocabulary):
+        """Class constructor.
+
+        :param dict vocabulary: mapping from feature names (tuples) to
+          column indices (e.g., `vocabulary_` of a DictVectorizer)
+
+        """
+        self.n_features = len(vocabulary)
+        self._fixed = {}
+        self._templates = {}
+        for name, col in iteritems(vocabulary):
+            if isinstance(name, tuple) and len(name) == 3:
+                self._templates.setdefault(name[:2], {})[name[2]] = col
+            else:
+                self._fixed[name] = col
+
+    def fixed(self, *name):
+        """Get column index of a non-templated feature.
+
+        :param tuple name: name of the feature
+
+        :return: column index or -1 for unseen features
+        :rtype: int
+
+        """
+        return self._fixed.get(name, -1)
+
+    def get(self, name):
+        """Get column index of a feature.
+
+        :param name: name of the feature
+        :type name: tuple or str
+
+        :return: column index or -1 for unseen features
+        :rtype: int
+
+        """
+        if isinstance(name, tuple) and len(name) == 3:
+            return self._templates.get(name[:2], {}).get(name[2], -1)
+        return self._fixed.get(name, -1)
+
+    def template(self, *prefix):
+        """Get column indices of all values of a feature template.
+
+        :param tuple prefix: name of the template
+
+        :return: mapping from feature values to column indices
+        :rtype: dict
+
+        """
+        return self._templates.get(prefix, {})
+
+    def feature_names(self):
+        """Get names of all features in the order of their columns.
+
+        :rtype: list[tuple]
+
+        """
+        names = [None] * self.n_features
+        for name, col in iteritems(self._fixed):
+            names[col] = name
+        for prefix, cols in iteritems(self._templates):
+            for value, col in iteritems(cols):
+                names[col] = prefix + (value,)
+        return names
+
+    def to_columns(self):
+        """Describe the index column by column (e.g., for storing it).
+
+        Columns of sorted vocabularies (as built by a DictVectorizer)
+        form a single run per template, so that the prefix of a template
+        is only stored once.
+
+        :return: mapping from non-templated feature names to columns,
+          runs of consecutive columns of the same template (as tuples of
+          the prefix, the first, and the last plus one column), and the
+          feature values of all columns (empty for non-templated ones)
+        :rtype: tuple(dict, list[tuple], list[str])
+
+        """
+        prefixes = [None] * self.n_features
+        values = [""] * self.n_features
+        for prefix, cols in iteritems(self._templates):
+            for value, col in iteritems(cols):
+                prefixes[col] = prefix
+                values[col] = value
+        runs = []
+        for col, prefix in enumerate(prefixes):
+            if prefix is None:
+                continue
+            if runs and runs[-1][0] == prefix and runs[-1][2] == col:
+                runs[-1][2] = col + 1
+            else:
+                runs.append([prefix, col, col + 1])
+        return dict(self._fixed), [tuple(run) for run in runs], values
+
     @classmethod
-    def extract_feats(cls, stack_node1, stack_node2,
+    def from_columns(cls, fixed, runs, values):
+        """Restore an index described by :meth:`to_columns`.
+
+        :param dict fixed: mapping from non-templated feature names to
+          columns
+        :param list[tuple] runs: prefix, first column, and last plus one
+          column of every run of columns of the same template
+        :param list[str] values: feature values of all columns
+
+        :rtype: FrozenVocabulary
+
+        """
+        vocab = cls({})
+        vocab.n_features = len(values)
+        vocab._fixed = dict(fixed)
+        for prefix, start, stop in runs:
+            vocab._templates.setdefault(tuple(prefix), {}).update(
+                zip(values[start:stop], range(start, stop))
+            )
+        return vocab
+
+
+class TupleHasher(FeatureHasher):
+    """Signed hashing of feature dicts with tuple names.
+
+    Feature names are joined to strings and hashed into a fixed number
+    of columns, so that neither the model nor its vectorizer store a
+    vocabulary.  Since `alternate_sign` is on by default, the sign of a
+    feature's value is also determined by the hash, so that collisions
+    cancel out in expectation.
+
+    """
+    def transform(self, raw_X):
+        """Hash feature dicts into a sparse matrix.
+
+        :param raw_X: feature dicts (names may be tuples of strings) or
+          a single dict
+        :type raw_X: list[dict] or dict
+
+        :return: feature matrix
+        :rtype: scipy.sparse.csr_matrix
+
+        """
+        if isinstance(raw_X, dict):
+            raw_X = [raw_X]
+        return super(TupleHasher, self).transform(
+            dict((name if isinstance(name, string_types)
+                  else HASH_SEP.join(name), value)
+                 for name, value in iteritems(feats))
+            for feats in raw_X
+        )
+
+
+class FeatureGroup(object):
+    """Named feature template which can be switched on and off.
+
+    Groups are either extracted for every single node (`per_node`, in
+    which case the extraction function receives the node at its
+    position and None for the other two nodes, and the results are
+    memoized per node) or for the whole parser state.
+
+    """
+    def __init__(self, name, extract, per_node=True, extract_many=None,
+                 cols=None):
+        """Class constructor.
+
+        :param str name: name of the group
+        :param extract: function which adds the features of a state to
+          a dict (with the same arguments as
+          :meth:`FeatureExtractor.extract_feats` preceded by the dict)
+          or the name of such a method of FeatureExtractor
+        :type extract: callable or str
+        :param bool per_node: whether the features only depend on a
+          single node
+        :param extract_many: optional function which adds the features
+          of multiple nodes (or states) of the same document at once
+          (its arguments are the list of target dicts, the list of
+          (position, node) pairs (or states), the CoNLL document, and its
+          token table) or the name of such a method of FeatureExtractor
+        :type extract_many: callable or str or None
+        :param cols: optional function which adds the known feature
+          columns of a node (or state) with their values to a dict
+          without building feature names (its arguments are the dict,
+          the position of the node, the node, the CoNLL document, its
+          `DocFeatures`, the number of its EDUs, and the
+          `FrozenVocabulary`, or, for state groups, the dict, the state,
+          its `DocFeatures`, the number of EDUs, and the vocabulary) or
+          the name of such a method of FeatureExtractor; groups without
+          it look up the names of their extracted features
+        :type cols: callable or str or None
+
+        """
+        self.name = name
+        self.extract = extract
+        self.per_node = per_node
+        self.extract_many = extract_many
+        self.cols = cols
+
+    def bind(self, extractor):
+        """Resolve names of extraction methods for the given extractor.
+
+        :param FeatureExtractor extractor: extractor whose methods should
+          be used
+
+        :return: group with callable extraction functions
+        :rtype: FeatureGroup
+
+        """
+        extract, extract_many, cols = [
+            getattr(extractor, func) if isinstance(func, string_types)
+            else func for func in (self.extract, self.extract_many,
+                                   self.cols)
+        ]
+        if cols is None:
+            cols = partial(_lookup_node_cols if self.per_node
+                           else _lookup_state_cols, extract)
+        return FeatureGroup(self.name, extract, self.per_node, extract_many,
+                            cols)
+
+
+class GroupTimer(object):
+    """Accumulated extraction time of feature groups.
+
+    Note that concurrent extractions (e.g., of threads sharing the same
+    model) may occasionally lose updates of the counters.
+
+    """
+    def __init__(self):
+        self.seconds = {}
+        self.n_states = 0
+
+    @staticmethod
+    def now():
+        """Get the start time of the next measurement.
+
+        :rtype: float
+
+        """
+        return default_timer()
+
+    def lap(self, group, start):
+        """Add the time elapsed since start to the counter of a group.
+
+        :param str group: name of the group
+        :param float start: start time of the measurement
+
+        :return: start time of the next measurement
+        :rtype: float
+
+        """
+        now = default_timer()
+        self.seconds[group] = self.seconds.get(group, 0.) + now - start
+        return now
+
+    def count(self, n_states):
+        """Increment the number of featurized parser states.
+
+        :param int n_states: number of new states
+
+        """
+        self.n_states += n_states
+
+    def report(self):
+        """Summarize the time spent in each group.
+
+        :return: triples of group names, seconds, and microseconds per
+          featurized parser state, the most expensive group first
+        :rtype: list[tuple(str, float, float)]
+
+        """
+        n_states = max(self.n_states, 1)
+        return sorted(((group, seconds, 1e6 * seconds / n_states)
+                       for group, seconds in iteritems(self.seconds)),
+                      key=lambda entry: -entry[1])
+
+    def clear(self):
+        """Reset all counters.
+
+        """
+        self.seconds.clear()
+        self.n_states = 0
+
+
+class _NoTimer(object):
+    """Stand-in for GroupTimer when timing is disabled.
+
+    """
+    @staticmethod
+    def now():
+        return None
+
+    @staticmethod
+    def lap(group, start):
+        return None
+
+    @staticmethod
+    def count(n_states):
+        pass
+
+
+NO_TIMER = _NoTimer()
+
+
+class FeatureExtractor(object):
+    """Extractor of features from parser states.
+
+    Features are extracted by the enabled groups of
+    :data:`FEATURE_GROUPS`.  Since features of single nodes are
+    memoized, changing the enabled groups (or the embeddings) clears the
+    caches.
+
+    """
+    def __init__(self, cache_size=DFLT_CACHE_SIZE,
+                 groups=DFLT_FEATURE_GROUPS, embeddings=None):
+        """Class constructor.
+
+        :param int cache_size: maximum number of cached node features
+        :param list[str] groups: names of the feature groups to extract
+        :param embeddings: word embeddings of the `embed` group
+        :type embeddings: rstparser.embeddings.Embeddings or None
+
+        """
+        self._cache_size = cache_size
+        self._span_cache = None
+        self._col_cache = None
+        self._embeddings = embeddings
+        self._groups = ()
+        self._node_groups = None
+        self._state_groups = None
+        self._timer = NO_TIMER
+        self.groups = groups
+
+    @property
+    def span_cache(self):
+        """Get cache of node features (with `hits`, `misses`, and `hit_rate`).
+
+        :rtype: rstparser.cache.LRUCache
+
+        """
+        return self._span_cache
+
+    @property
+    def cache_size(self):
+        """Get maximum number of cached node features.
+
+        :rtype: int
+
+        """
+        return getattr(self, "_cache_size", DFLT_CACHE_SIZE)
+
+    @property
+    def groups(self):
+        """Get names of the enabled feature groups.
+
+        :rtype: tuple[str]
+
+        """
+        return getattr(self, "_groups", DFLT_FEATURE_GROUPS)
+
+    @groups.setter
+    def groups(self, groups):
+        """Enable the given feature groups (and disable all others).
+
+        :param list[str] groups: names of the feature groups to extract
+
+        :raises ValueError: if a group is not registered or if the
+          `embed` group is enabled without embeddings
+
+        """
+        unknown = set(groups) - set(FEATURE_GROUPS)
+        if unknown:
+            raise ValueError("Unknown feature groups: {:s}".format(
+                ", ".join(sorted(unknown))))
+        if "embed" in groups and self.embeddings is None:
+            raise ValueError("Feature group 'embed' requires embeddings")
+        self._groups = tuple(name for name in FEATURE_GROUPS
+                             if name in groups)
+        self.restore()
+
+    @property
+    def embeddings(self):
+        """Get word embeddings of the `embed` group.
+
+        :rtype: rstparser.embeddings.Embeddings or None
+
+        """
+        return getattr(self, "_embeddings", None)
+
+    @embeddings.setter
+    def embeddings(self, embeddings):
+        """Set word embeddings of the `embed` group.
+
+        :param embeddings: new embeddings
+        :type embeddings: rstparser.embeddings.Embeddings or None
+
+        """
+        self._embeddings = embeddings
+        self.restore()
+
+    @property
+    def timer(self):
+        """Get extraction times of feature groups.
+
+        :return: timer or None if timing is disabled
+        :rtype: GroupTimer or None
+
+        """
+        timer = getattr(self, "_timer", NO_TIMER)
+        return None if timer is NO_TIMER else timer
+
+    def enable_timing(self, enable=True):
+        """Start (or stop) measuring extraction times of feature groups.
+
+        :param bool enable: whether to measure extraction times
+
+        """
+        self._timer = GroupTimer() if enable else NO_TIMER
+
+    def clear_cache(self):
+        """Drop the cached features of all nodes.
+
+        """
+        if self._span_cache is not None:
+            self._span_cache.clear()
+            self._col_cache.clear()
+
+    def reset(self):
+        """Set all unpickable components to None.
+
+        """
+        self._span_cache = None
+        self._col_cache = None
+        self._node_groups = None
+        self._state_groups = None
+        self._timer = NO_TIMER
+        if self.embeddings is not None:
+            self.embeddings.reset()
+
+    def restore(self):
+        """Restore all components that were reset at pickling.
+
+        """
+        self._span_cache = LRUCache(self.cache_size)
+        self._col_cache = LRUCache(self.cache_size)
+        if self.embeddings is not None:
+            self.embeddings.restore()
+        groups = [FEATURE_GROUPS[name].bind(self) for name in self.groups]
+        self._node_groups = [group for group in groups if group.per_node]
+        self._state_groups = [group for group in groups
+                              if not group.per_node]
+        if not hasattr(self, "_timer"):
+            self._timer = NO_TIMER
+
+    def extract_feats(self, stack_node1, stack_node2,
                       queue_node, conll):
         """Main function to extract features.
 
-        :param class cls: pointer to this class
         :param stack_node1: first RST node on the stack
         :type stack_node1: SpanNode or None
         :param stack_node2: second RST node on the stack
@@ -31,26 +708,402 @@ class FeatureExtractor(object):
         LOGGER.debug("stack_node2: %r", stack_node2)
         LOGGER.debug("queue_node: %r", queue_node)
         LOGGER.debug("conll: %r", conll)
+        timer = self._timer
         feats = {}
-        # Status features (Basic features)
-        cls.extract_status_feats(feats, stack_node1, stack_node2,
-                                 queue_node, conll)
-        # Lexical features
-        cls.extract_lex_feats(feats, stack_node1, stack_node2,
-                              queue_node, conll)
-        # Structural features
-        cls.extract_struct_feats(feats, stack_node1, stack_node2,
-                                 queue_node, conll)
-        # EDU features
-        cls.extract_edu_feats(feats, stack_node1, stack_node2,
-                              queue_node, conll)
-        # Distributional representation
-        cls.extract_distrib_feats(feats, stack_node1, stack_node2,
-                                  queue_node, conll)
+        # Features of the whole state (status and node pairs)
+        start = timer.now()
+        for group in self._state_groups:
+            group.extract(feats, stack_node1, stack_node2, queue_node,
+                          conll)
+            start = timer.lap(group.name, start)
+        # Features of single nodes (in this order, since the EDU
+        # features of the second stack node overwrite the ones of the
+        # first node)
+        if self._node_groups:
+            doc_feats = DocFeatures.get(conll)
+            doclen = len(conll.edudict)
+            for role, node in ((TOP1, stack_node1), (TOP2, stack_node2),
+                               (FIRST, queue_node)):
+                if node is not None:
+                    feats.update(self._get_node_feats(role, node, conll,
+                                                      doc_feats, doclen))
+        timer.count(1)
         LOGGER.debug("feats: %r", feats)
         # No Brown clusters
         return feats
 
+    def extract_rows(self, samples, vocab):
+        """Build the feature matrix of parser states without feature dicts.
+
+        :param list[tuple] samples: parser states (4-tuples of the first
+          and second stack nodes, the first queue node, and the CoNLL
+          document)
+        :param FrozenVocabulary vocab: column indices of known features
+
+        :return: feature matrix (one row per state)
+        :rtype: scipy.sparse.csr_matrix
+
+        """
+        indices, data, indptr = self.extract_cols(samples, vocab)
+        return csr_matrix((data, indices, indptr),
+                          shape=(len(samples), vocab.n_features))
+
+    def extract_cols(self, samples, vocab):
+        """Look up column indices and values of the features of states.
+
+        Every feature group adds its columns with its `cols` function.
+        The built-in groups look up their column indices directly in the
+        frozen vocabulary, so that features unseen at training time are
+        dropped before their names are built.  The columns of single
+        nodes are memoized like their features in :meth:`extract_feats`.
+
+        :param list[tuple] samples: parser states (4-tuples of the first
+          and second stack nodes, the first queue node, and the CoNLL
+          document)
+        :param FrozenVocabulary vocab: column indices of known features
+
+        :return: column indices and values of the features of all states
+          and the offsets of each state's features (in the CSR layout)
+        :rtype: tuple(np.array, np.array, np.array)
+
+        """
+        timer = self._timer
+        indices = []
+        data = []
+        indptr = [0]
+        for sample in samples:
+            stack_node1, stack_node2, queue_node, conll = sample
+            if stack_node1 is None and stack_node2 is not None:
+                raise ValueError("Unrecognized stack status")
+            doc_feats = DocFeatures.get(conll)
+            doclen = len(conll.edudict)
+            # Features of whole states
+            feats = {}
+            start = timer.now()
+            for group in self._state_groups:
+                group.cols(feats, sample, doc_feats, doclen, vocab)
+                start = timer.lap(group.name, start)
+            cols = list(feats)
+            vals = list(itervalues(feats))
+            # Features of single nodes
+            for role, node in enumerate(sample[:3]):
+                if node is not None:
+                    node_cols, node_vals = self._get_node_cols(
+                        role, node, conll, doc_feats, doclen, vocab
+                    )
+                    cols.extend(node_cols)
+                    vals.extend(node_vals)
+            for col, val in zip(cols, vals):
+                if col >= 0 and val:
+                    indices.append(col)
+                    data.append(val)
+            indptr.append(len(indices))
+        timer.count(len(samples))
+        return (np.array(indices, dtype=np.int32),
+                np.array(data, dtype=np.float64),
+                np.array(indptr, dtype=np.int32))
+
+    def _get_node_cols(self, role, node, conll, doc_feats, doclen, vocab):
+        """Look up or compute known feature columns of a single node.
+
+        :param int role: position of the node (TOP1, TOP2, or FIRST)
+        :param SpanNode node: node whose features should be extracted
+        :param conll: conll document
+        :type conll: CoNLLDoc
+        :param DocFeatures doc_feats: cached information of the document
+        :param int doclen: number of EDUs in the document
+        :param FrozenVocabulary vocab: column indices of known features
+
+        :return: column indices and values of the features
+        :rtype: tuple(list[int], list[float])
+
+        """
+        key = (doc_feats.doc_id, role, node.eduspan, node.nucedu, doclen)
+        node_cols = self._col_cache.get(key)
+        if node_cols is not None:
+            return node_cols
+        timer = self._timer
+        feats = {}
+        start = timer.now()
+        for group in self._node_groups:
+            group.cols(feats, role, node, conll, doc_feats, doclen, vocab)
+            start = timer.lap(group.name, start)
+        feats.pop(-1, None)
+        # sorted columns make the order of accumulation (and thus the
+        # rounding of scores) independent of the iteration order of sets
+        cols = sorted(feats)
+        node_cols = (cols, [feats[col] for col in cols])
+        self._col_cache.put(key, node_cols)
+        return node_cols
+
+    def extract_feats_many(self, samples):
+        """Extract features of multiple parser states at once.
+
+        This produces the same features as :meth:`extract_feats`, but
+        computes sentence features, boundary n-grams, and lemma bags of
+        each document with array indexing into its token table.  (States
+        of documents with fewer than `MIN_VECTOR_BATCH` states in the
+        batch are processed one by one, since array operations only pay
+        off for larger batches.)
+
+        :param list[tuple] samples: parser states (4-tuples of the first
+          and second stack nodes, the first queue node, and the CoNLL
+          document)
+
+        :return: features of the states
+        :rtype: list[dict]
+
+        """
+        feats = [{} for _ in samples]
+        # group states by document
+        docs = {}
+        for i, sample in enumerate(samples):
+            conll = sample[-1]
+            docs.setdefault(id(conll), (conll, []))[1].append(i)
+        for conll, idcs in itervalues(docs):
+            if len(idcs) < MIN_VECTOR_BATCH:
+                for i in idcs:
+                    feats[i] = self.extract_feats(*samples[i])
+            else:
+                self._extract_doc_feats_many(
+                    [feats[i] for i in idcs], [samples[i] for i in idcs],
+                    conll
+                )
+        return feats
+
+    def _extract_doc_feats_many(self, feats, samples, conll):
+        """Extract features of multiple parser states of the same document.
+
+        :param list[dict] feats: target dictionaries of features
+        :param list[tuple] samples: parser states
+        :param conll: conll document
+        :type conll: CoNLLDoc
+
+        """
+        timer = self._timer
+        table = conll.token_table
+        doc_feats = DocFeatures.get(conll)
+        doclen = len(conll.edudict)
+        # look up features of single nodes
+        keys = []
+        node_feats = {}
+        missing = {}
+        for sample in samples:
+            sample_keys = []
+            for role, node in enumerate(sample[:3]):
+                if node is None or not self._node_groups:
+                    continue
+                key = (doc_feats.doc_id, role, node.eduspan, node.nucedu,
+                       doclen)
+                sample_keys.append(key)
+                if key in node_feats or key in missing:
+                    continue
+                cached = self._span_cache.get(key)
+                if cached is None:
+                    missing[key] = (role, node)
+                else:
+                    node_feats[key] = cached
+            keys.append(sample_keys)
+        if missing:
+            missing = list(missing.items())
+            for (key, _), feats_i in zip(
+                    missing,
+                    self._compute_node_feats_many(
+                        [role_node for _, role_node in missing],
+                        conll, table)):
+                node_feats[key] = feats_i
+                self._span_cache.put(key, feats_i)
+        for feats_i, sample_keys in zip(feats, keys):
+            for key in sample_keys:
+                feats_i.update(node_feats[key])
+        # features of whole states
+        start = timer.now()
+        for group in self._state_groups:
+            if group.extract_many is None:
+                for feats_i, sample in zip(feats, samples):
+                    group.extract(feats_i, *sample)
+            else:
+                group.extract_many(feats, samples, conll, table)
+            start = timer.lap(group.name, start)
+        timer.count(len(samples))
+
+    def _compute_node_feats_many(self, nodes, conll, table):
+        """Compute features of multiple single nodes of a document.
+
+        :param list[tuple] nodes: pairs of node positions and nodes
+        :param conll: conll document
+        :type conll: CoNLLDoc
+        :param TokenTable table: token table of the document
+
+        :return: features of the nodes
+        :rtype: list[tuple[tuple]]
+
+        """
+        timer = self._timer
+        feats = [{} for _ in nodes]
+        start = timer.now()
+        for group in self._node_groups:
+            if group.extract_many is None:
+                for feats_i, (role, node) in zip(feats, nodes):
+                    role_nodes = [None, None, None]
+                    role_nodes[role] = node
+                    group.extract(feats_i, *role_nodes, conll=conll)
+            else:
+                group.extract_many(feats, nodes, conll, table)
+            start = timer.lap(group.name, start)
+        return [tuple(feats_i.items()) for feats_i in feats]
+
+    @staticmethod
+    def _extract_lex_feats_many(feats, nodes, conll, table):
+        """Compute boundary n-grams of multiple single nodes.
+
+        :param list[dict] feats: target dictionaries of features
+        :param list[tuple] nodes: pairs of node positions and nodes
+        :param conll: conll document
+        :type conll: CoNLLDoc
+        :param TokenTable table: token table of the document
+
+        """
+        # first, second, penultimate, and last token of every span
+        n_toks = []
+        bounds = []
+        for _, node in nodes:
+            text = node.text
+            n = len(text)
+            n_toks.append(n)
+            if n > 1:
+                bounds.append((text[0], text[1], text[-2], text[-1]))
+            elif n:
+                bounds.append((text[0], text[0], text[0], text[0]))
+            else:
+                bounds.append((0, 0, 0, 0))
+        bounds = np.array(bounds, dtype=np.int64).reshape(-1, 4)
+        lemmas = table.lemma[bounds].tolist()
+        tags = table.pos[bounds[:, [0, 3]]].tolist()
+        lemma_strs = table.lemma_vocab.strings
+        tag_strs = table.pos_vocab.strings
+        for feats_i, (role, _), n, lemmas_i, tags_i in zip(
+                feats, nodes, n_toks, lemmas, tags):
+            if not n:
+                continue
+            first, second, penult, last = [lemma_strs[i] for i in lemmas_i]
+            grams = [first, last, tag_strs[tags_i[0]], tag_strs[tags_i[1]]]
+            if n > 1:
+                grams.append(first + ' ' + second)
+                grams.append(penult + ' ' + last)
+            role_name = ROLE_NAMES[role]
+            for gram in grams:
+                feats_i[(role_name, 'nGram', gram)] = 1
+
+    @staticmethod
+    def _extract_distrib_feats_many(feats, nodes, conll, table):
+        """Compute lemma bags of the nuclear EDUs of multiple single nodes.
+
+        :param list[dict] feats: target dictionaries of features
+        :param list[tuple] nodes: pairs of node positions and nodes
+        :param conll: conll document
+        :type conll: CoNLLDoc
+        :param TokenTable table: token table of the document
+
+        """
+        lemma_strs = table.lemma_vocab.strings
+        edudict = conll.edudict
+        for feats_i, (role, node) in zip(feats, nodes):
+            disrep_name = DISREP_NAMES[role]
+            for lemma in table.edu_lemmas(edudict, node.nucedu).tolist():
+                feats_i[('DisRep', disrep_name, lemma_strs[lemma])] = 1
+
+    @staticmethod
+    def _extract_sent_feats_many(feats, samples, conll, table):
+        """Compute sentence features of node pairs for multiple states.
+
+        :param list[dict] feats: target dictionaries of features
+        :param list[tuple] samples: parser states of the same document
+        :param conll: conll document
+        :type conll: CoNLLDoc
+        :param TokenTable table: token table of the document
+
+        """
+        # boundary tokens of node pairs (-1 for missing nodes)
+        pairs = np.full((4, len(samples)), -1, dtype=np.int64)
+        for i, (stack_node1, stack_node2, queue_node, _) in \
+                enumerate(samples):
+            if stack_node1 is None:
+                continue
+            text1 = stack_node1.text
+            if stack_node2 is not None:
+                pairs[0, i] = text1[-1]
+                pairs[1, i] = stack_node2.text[0]
+            if queue_node is not None:
+                pairs[2, i] = text1[0]
+                pairs[3, i] = queue_node.text[-1]
+        sidx = table.sidx[pairs]
+        same = (pairs[[0, 2]] >= 0) & (sidx[[0, 2]] == sidx[[1, 3]])
+        for feats_i, same12, same13 in zip(feats, same[0].tolist(),
+                                           same[1].tolist()):
+            feats_i[('Top12-Stack', 'SameSent')] = int(same12)
+            feats_i[('Stack-Queue', 'SameSent')] = int(same13)
+
+    def _get_node_feats(self, role, node, conll, doc_feats, doclen):
+        """Look up or compute features of a single node.
+
+        :param int role: position of the node (TOP1, TOP2, or FIRST)
+        :param SpanNode node: node whose features should be extracted
+        :param conll: conll document
+        :type conll: CoNLLDoc
+        :param DocFeatures doc_feats: cached information of the document
+        :param int doclen: number of EDUs in the document
+
+        :return: extracted features
+        :rtype: tuple[tuple]
+
+        """
+        key = (doc_feats.doc_id, role, node.eduspan, node.nucedu, doclen)
+        node_feats = self._span_cache.get(key)
+        if node_feats is None:
+            timer = self._timer
+            nodes = [None, None, None]
+            nodes[role] = node
+            feats = {}
+            start = timer.now()
+            for group in self._node_groups:
+                group.extract(feats, *nodes, conll=conll)
+                start = timer.lap(group.name, start)
+            node_feats = tuple(feats.items())
+            self._span_cache.put(key, node_feats)
+        return node_feats
+
+    def extract_embed_feats(self, feats, stack_node1, stack_node2,
+                            queue_node, conll):
+        """Main function to extract averaged word embeddings.
+
+        :param dict feats: target dictionary of features
+        :param stack_node1: first RST node on the stack
+        :type stack_node1: SpanNode or None
+        :param stack_node2: second RST node on the stack
+        :type stack_node2: SpanNode or None
+        :param queue_node: first RST node in the queue
+        :type queue_node: SpanNode or None
+        :param conll: conll document
+        :type conll: CoNLLDoc
+
+        """
+        doc_feats = DocFeatures.get(conll)
+        for disrep_name, node in zip(DISREP_NAMES, (stack_node1, stack_node2,
+                                                    queue_node)):
+            if node is None:
+                continue
+            vec = self._embeddings.mean(doc_feats.lemmas(node.nucedu))
+            if vec is None:
+                continue
+            names = _EMB_NAMES.get((disrep_name, len(vec)))
+            if names is None:
+                names = _EMB_NAMES[(disrep_name, len(vec))] = [
+                    ('Emb', disrep_name, "{:d}".format(i))
+                    for i in range(len(vec))
+                ]
+            feats.update(zip(names, vec.tolist()))
+
     @classmethod
     def extract_struct_feats(cls, feats, stack_node1, stack_node2,
                              queue_node, conll):
@@ -136,7 +1189,6 @@ class FeatureExtractor(object):
         :type conll: CoNLLDoc
 
         """
-        tokendict = conll.tokendict
         # ---------------------------------------
         # EDU length
         if stack_node1 is not None:
@@ -145,13 +1197,33 @@ class FeatureExtractor(object):
         if stack_node2 is not None:
             eduspan = stack_node2.eduspan
             feats[('Top1-Stack', 'nEDUs')] = eduspan[1] - eduspan[0]+1
+
+    @classmethod
+    def extract_sent_feats(cls, feats, stack_node1, stack_node2,
+                           queue_node, conll):
+        """Main function to extract sentence features of node pairs.
+
+        :param class cls: pointer to this class
+        :param dict feats: target dictionary of features
+        :param stack_node1: first RST node on the stack
+        :type stack_node1: SpanNode or None
+        :param stack_node2: second RST node on the stack
+        :type stack_node2: SpanNode or None
+        :param queue_node: first RST node in the queue
+        :type queue_node: SpanNode or None
+        :param conll: conll document
+        :type conll: CoNLLDoc
+
+        """
+        doc_feats = DocFeatures.get(conll)
         # ---------------------------------------
         # Whether within same sentence
         # Span 1 and 2
         # Last word from span 1, first word from span 2
         try:
             text1, text2 = stack_node1.text, stack_node2.text
-            if (tokendict[text1[-1]].sidx == tokendict[text2[0]].sidx):
+            if (doc_feats.token(text1[-1])[2]
+                    == doc_feats.token(text2[0])[2]):
                 feats[('Top12-Stack', 'SameSent')] = 1
             else:
                 feats[('Top12-Stack', 'SameSent')] = 0
@@ -161,7 +1233,8 @@ class FeatureExtractor(object):
         # First word from span 1, last word from span 3
         try:
             text1, text3 = stack_node1.text, queue_node.text
-            if (tokendict[text1[0]].sidx == tokendict[text3[-1]].sidx):
+            if (doc_feats.token(text1[0])[2]
+                    == doc_feats.token(text3[-1])[2]):
                 feats[('Stack-Queue', 'SameSent')] = 1
             else:
                 feats[('Stack-Queue', 'SameSent')] = 0
@@ -185,22 +1258,22 @@ class FeatureExtractor(object):
         :type conll: CoNLLDoc
 
         """
-        tokendict = conll.tokendict
+        doc_feats = DocFeatures.get(conll)
         if stack_node1 is not None:
             span = stack_node1
             # feats[('Top1-Stack', 'nTokens', len(span.text))
-            grams = getgrams(span.text, tokendict)
+            grams = doc_feats.grams(span.text)
             for gram in grams:
                 feats[('Top1-Stack', 'nGram', gram)] = 1
         if stack_node2 is not None:
             span = stack_node2
             # feats[('Top2-Stack', 'nTokens', len(span.text))
-            grams = getgrams(span.text, tokendict)
+            grams = doc_feats.grams(span.text)
             for gram in grams:
                 feats[('Top2-Stack', 'nGram', gram)] = 1
         if queue_node is not None:
             # feats[('First-Queue', 'nTokens', len(span.text))
-            grams = getgrams(queue_node.text, tokendict)
+            grams = doc_feats.grams(queue_node.text)
             for gram in grams:
                 feats[('First-Queue', 'nGram', gram)] = 1
 
@@ -221,20 +1294,157 @@ class FeatureExtractor(object):
         :type conll: CoNLLDoc
 
         """
-        tokendict = conll.tokendict
-        edudict = conll.edudict
+        doc_feats = DocFeatures.get(conll)
         if stack_node1 is not None:
-            eduidx = stack_node1.nucedu
-            for gidx in edudict[eduidx]:
-                word = tokendict[gidx].lemma.lower()
+            for word in doc_feats.lemmas(stack_node1.nucedu):
                 feats[('DisRep', 'Top1Span', word)] = 1
         if stack_node2 is not None:
-            eduidx = stack_node2.nucedu
-            for gidx in edudict[eduidx]:
-                word = tokendict[gidx].lemma.lower()
+            for word in doc_feats.lemmas(stack_node2.nucedu):
                 feats[('DisRep', 'Top2Span', word)] = 1
         if queue_node is not None:
-            eduidx = queue_node.nucedu
-            for gidx in edudict[eduidx]:
-                word = tokendict[gidx].lemma.lower()
+            for word in doc_feats.lemmas(queue_node.nucedu):
                 feats[('DisRep', 'FirstSpan', word)] = 1
+
+    @staticmethod
+    def _get_status_cols(feats, sample, doc_feats, doclen, vocab):
+        """Look up columns of the status features of a state.
+
+        :param dict feats: target mapping from columns to values
+        :param tuple sample: parser state
+        :param DocFeatures doc_feats: cached information of the document
+        :param int doclen: number of EDUs in the document
+        :param FrozenVocabulary vocab: column indices of known features
+
+        """
+        if sample[0] is None:
+            feats[vocab.fixed('Stack', 'Empty')] = 1.
+        elif sample[1] is None:
+            feats[vocab.fixed('Stack', 'OneElem')] = 1.
+        else:
+            feats[vocab.fixed('Stack', 'MoreElem')] = 1.
+        if sample[2] is None:
+            feats[vocab.fixed('Queue', 'Empty')] = 1.
+        else:
+            feats[vocab.fixed('Queue', 'NonEmpty')] = 1.
+
+    @staticmethod
+    def _get_edu_cols(feats, sample, doc_feats, doclen, vocab):
+        """Look up the column of the EDU length of a state.
+
+        :param dict feats: target mapping from columns to values
+        :param tuple sample: parser state
+        :param DocFeatures doc_feats: cached information of the document
+        :param int doclen: number of EDUs in the document
+        :param FrozenVocabulary vocab: column indices of known features
+
+        """
+        # the second stack node overwrites the length of the first one
+        node = sample[1] or sample[0]
+        if node is not None:
+            feats[vocab.fixed('Top1-Stack', 'nEDUs')] = \
+                node.eduspan[1] - node.eduspan[0] + 1
+
+    @staticmethod
+    def _get_sent_cols(feats, sample, doc_feats, doclen, vocab):
+        """Look up columns of the sentence features of a state.
+
+        :param dict feats: target mapping from columns to values
+        :param tuple sample: parser state
+        :param DocFeatures doc_feats: cached information of the document
+        :param int doclen: number of EDUs in the document
+        :param FrozenVocabulary vocab: column indices of known features
+
+        """
+        stack_node1, stack_node2, queue_node, _ = sample
+        if stack_node1 is None:
+            return
+        if stack_node2 is not None:
+            feats[vocab.fixed('Top12-Stack', 'SameSent')] = float(
+                doc_feats.token(stack_node1.text[-1])[2]
+                == doc_feats.token(stack_node2.text[0])[2])
+        if queue_node is not None:
+            feats[vocab.fixed('Stack-Queue', 'SameSent')] = float(
+                doc_feats.token(stack_node1.text[0])[2]
+                == doc_feats.token(queue_node.text[-1])[2])
+
+    @staticmethod
+    def _get_lex_cols(feats, role, node, conll, doc_feats, doclen, vocab):
+        """Look up columns of the boundary n-grams of a node.
+
+        :param dict feats: target mapping from columns to values
+        :param int role: position of the node (TOP1, TOP2, or FIRST)
+        :param SpanNode node: node whose features should be extracted
+        :param CoNLLDoc conll: conll document
+        :param DocFeatures doc_feats: cached information of the document
+        :param int doclen: number of EDUs in the document
+        :param FrozenVocabulary vocab: column indices of known features
+
+        """
+        gram_cols = vocab.template(ROLE_NAMES[role], 'nGram')
+        for gram in doc_feats.grams(node.text):
+            col = gram_cols.get(gram)
+            if col is not None:
+                feats[col] = 1.
+
+    @staticmethod
+    def _get_struct_cols(feats, role, node, conll, doc_feats, doclen, vocab):
+        """Look up columns of the structural features of a node.
+
+        :param dict feats: target mapping from columns to values
+        :param int role: position of the node (TOP1, TOP2, or FIRST)
+        :param SpanNode node: node whose features should be extracted
+        :param CoNLLDoc conll: conll document
+        :param DocFeatures doc_feats: cached information of the document
+        :param int doclen: number of EDUs in the document
+        :param FrozenVocabulary vocab: column indices of known features
+
+        """
+        role_name = ROLE_NAMES[role]
+        eduspan = node.eduspan
+        if role != FIRST:
+            feats[vocab.fixed(role_name, 'Length-EDU')] = \
+                eduspan[1] - eduspan[0] + 1
+            feats[vocab.fixed(role_name, 'Dist-To-End')] = \
+                doclen - eduspan[1]
+        feats[vocab.fixed(role_name, 'Dist-To-Begin')] = eduspan[0]
+
+    @staticmethod
+    def _get_distrib_cols(feats, role, node, conll, doc_feats, doclen,
+                          vocab):
+        """Look up columns of the lemma bag of a node's nuclear EDU.
+
+        :param dict feats: target mapping from columns to values
+        :param int role: position of the node (TOP1, TOP2, or FIRST)
+        :param SpanNode node: node whose features should be extracted
+        :param CoNLLDoc conll: conll document
+        :param DocFeatures doc_feats: cached information of the document
+        :param int doclen: number of EDUs in the document
+        :param FrozenVocabulary vocab: column indices of known features
+
+        """
+        lemma_cols = vocab.template('DisRep', DISREP_NAMES[role])
+        for lemma in doc_feats.lemmas(node.nucedu):
+            col = lemma_cols.get(lemma)
+            if col is not None:
+                feats[col] = 1.
+
+
+##################################################################
+# Built-in feature groups
+register_feature_group("status", "extract_status_feats", per_node=False,
+                       cols="_get_status_cols")
+register_feature_group("lex", "extract_lex_feats",
+                       extract_many="_extract_lex_feats_many",
+                       cols="_get_lex_cols")
+register_feature_group("struct", "extract_struct_feats",
+                       cols="_get_struct_cols")
+# the EDU length depends on both stack nodes
+register_feature_group("edu", "extract_edu_feats", per_node=False,
+                       cols="_get_edu_cols")
+register_feature_group("distrib", "extract_distrib_feats",
+                       extract_many="_extract_distrib_feats_many",
+                       cols="_get_distrib_cols")
+register_feature_group("sent", "extract_sent_feats", per_node=False,
+                       extract_many="_extract_sent_feats_many",
+                       cols="_get_sent_cols")
+register_feature_group("embed", "extract_embed_feats")
@@ -12,17 +12,30 @@
 # Imports
 from __future__ import absolute_import, print_function, unicode_literals
 
-from six import iteritems
-from sklearn.exceptions import UndefinedMetricWarning
+from collections import Counter
+from itertools import islice
+from timeit import default_timer
+from six import iteritems, string_types
+from sklearn.base import clone
+from sklearn.exceptions import ConvergenceWarning, UndefinedMetricWarning
 from sklearn.pipeline import Pipeline
 from sklearn.feature_extraction import DictVectorizer
 from sklearn.metrics import precision_score, recall_score, f1_score
+from sklearn.model_selection import ParameterGrid
+from sklearn.linear_model import SGDClassifier
 from sklearn.svm import LinearSVC
+import codecs
+import json
+import math
+import multiprocessing
 import numpy as np
+import os
 import warnings
 
-from .feature import FeatureExtractor
-from .utils import LOGGER
+from .embeddings import Embeddings
+from .feature import FeatureExtractor, FrozenVocabulary, TupleHasher
+from .scorer import LinearScorer, SparseWeights
+from .utils import DFLT_ENCODING, LOGGER
 
 
 ##################################################################
@@ -31,61 +44,547 @@ DFLT_C = 0.02
 DFLT_CLS_WGHT = None
 DFLT_PARAMS = {"class_weight": DFLT_CLS_WGHT, "loss": "hinge",
                "penalty": "l1", "dual": True, "multi_class": "crammer_singer"}
+# minimum number of training instances in which a feature should occur
+# to be kept in the vocabulary
+DFLT_MIN_FREQ = 1
+# candidate hyper-parameters of the grid search (loss and penalty variants
+# which LinearSVC supports with one-vs-rest classification)
+GRID_C = [0.005, 0.01, 0.02, 0.05, 0.1]
+GRID_CLS_WGHT = [None, "balanced"]
+DFLT_PARAM_GRID = [
+    {"C": GRID_C, "class_weight": GRID_CLS_WGHT,
+     "multi_class": ["crammer_singer"]},
+    {"C": GRID_C, "class_weight": GRID_CLS_WGHT, "multi_class": ["ovr"],
+     "loss": ["hinge", "squared_hinge"], "penalty": ["l2"], "dual": [True]},
+    {"C": GRID_C, "class_weight": GRID_CLS_WGHT, "multi_class": ["ovr"],
+     "loss": ["squared_hinge"], "penalty": ["l1"], "dual": [False]}
+]
+# dev metric by which candidates of the grid search are ranked
+GRID_METRIC = "macro_f1"
+# minimum number of training instances of the first round of successive
+# halving
+MIN_HALVING_SAMPLES = 500
+# parameters of the online learner of streaming training (an averaged
+# linear SVM)
+DFLT_SGD_PARAMS = {"loss": "hinge", "alpha": 3e-6, "average": True}
+DFLT_N_EPOCHS = 10
+# number of samples vectorized at once in streaming training
+DFLT_CHUNK_SIZE = 2000
+# every DEV_STEP-th sample is held out for evaluation
+DEV_STEP = 15
+# type in which scores of exported models are accumulated (float32 halves
+# the memory of the weights, but changes some nearly tied decisions; see
+# benchmarks/bench_scorer.py)
+SCORE_DTYPE = np.float64
+# name and version of the memory-mappable model format (models whose
+# version is newer than this one cannot be loaded)
+MMAP_FORMAT = "rstparser-mmap"
+MMAP_VERSION = 2
+# files of the memory-mappable format
+META_FNAME = "meta.json"
+FEATURES_FNAME = "features.txt"
+WEIGHTS_FNAME = "weights.npy"
+BIAS_FNAME = "bias.npy"
+# files of the compacted (CSR) weights of the memory-mappable format
+SPARSE_FNAMES = {"data": "weights.data.npy",
+                 "indices": "weights.indices.npy",
+                 "indptr": "weights.indptr.npy",
+                 "scale": "weights.scale.npy"}
+# data shared by the processes of a grid search
+_GRID_DATA = None
+# integer codes of action types and nuclearity forms
+SHIFT = 0
+REDUCE = 1
+FORMS = ("NN", "NS", "SN")
+
+
+##################################################################
+# Methods
+def log_softmax(scores):
+    """Normalize rows of scores to log-probabilities.
+
+    Decoders normalize over all actions and only afterwards rule out the
+    illegal ones.  Normalizing over the legal actions alone would give
+    forced moves (e.g., the only possible shift) a probability of one,
+    which lowered the F1 scores of beam search and chart parsing on the
+    PCC test set (see benchmarks/bench_beam.py and bench_chart.py).
+
+    :param np.array scores: matrix of scores
+
+    :return: matrix of log-probabilities
+    :rtype: np.array
+
+    """
+    scores = np.array(scores, dtype=float)
+    scores -= scores.max(axis=1)[:, None]
+    scores -= np.log(np.exp(scores).sum(axis=1))[:, None]
+    return scores
+
+
+def prune_features(feats, min_freq=DFLT_MIN_FREQ, max_features=None):
+    """Remove rare features from feature dicts.
+
+    :param list[dict] feats: features of training instances
+    :param int min_freq: minimum number of instances in which a feature
+      should occur to be kept
+    :param max_features: maximum number of features to keep (the most
+      frequent ones)
+    :type max_features: int or None
+
+    :return: pruned features and the numbers of distinct features before
+      and after pruning
+    :rtype: tuple(list[dict], int, int)
+
+    """
+    counts = Counter()
+    for feats_i in feats:
+        counts.update(iter(feats_i))
+    keep = _select_features(counts, min_freq, max_features)
+    feats = [dict((name, value) for name, value in iteritems(feats_i)
+                  if name in keep)
+             for feats_i in feats]
+    return feats, len(counts), len(keep)
+
+
+def _select_features(counts, min_freq=DFLT_MIN_FREQ, max_features=None):
+    """Choose the features to keep in the vocabulary.
+
+    :param collections.Counter counts: numbers of instances in which the
+      features occur
+    :param int min_freq: minimum number of instances in which a feature
+      should occur to be kept
+    :param max_features: maximum number of features to keep (the most
+      frequent ones)
+    :type max_features: int or None
+
+    :return: names of the kept features
+    :rtype: set
+
+    """
+    keep = [name for name, cnt in iteritems(counts) if cnt >= min_freq]
+    if max_features is not None and len(keep) > max_features:
+        keep.sort(key=lambda name: (-counts[name], name))
+        keep = keep[:max_features]
+    return set(keep)
+
+
+def score_actions(gold, predicted):
+    """Compute macro-averaged precision, recall, and F1 and micro-F1.
+
+    :param list[int] gold: gold classes
+    :param list[int] predicted: predicted classes
+
+    :return: mapping from metric names to scores
+    :rtype: dict
+
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UndefinedMetricWarning)
+        return {"precision": precision_score(gold, predicted,
+                                             average="macro"),
+                "recall": recall_score(gold, predicted, average="macro"),
+                "macro_f1": f1_score(gold, predicted, average="macro"),
+                "micro_f1": f1_score(gold, predicted, average="micro")}
+
+
+def _init_grid_worker(data):
+    """Make the data of the grid search available to a worker process.
+
+    :param tuple data: classifier to clone, training matrix, training
+      classes, dev matrix, and dev classes
+
+    """
+    global _GRID_DATA
+    _GRID_DATA = data
+
+
+def _fit_candidate(task):
+    """Train and evaluate one candidate of the grid search.
+
+    :param tuple task: hyper-parameters of the classifier and the number
+      of training instances to use
+
+    :return: hyper-parameters, number of training instances, fitting
+      time in seconds, and dev metrics
+    :rtype: dict
+
+    """
+    params, n_samples = task
+    base_clf, train_x, train_y, dev_x, dev_y = _GRID_DATA
+    clf = clone(base_clf).set_params(**params)
+    start = default_timer()
+    with warnings.catch_warnings():
+        # weak candidates are dropped by their dev scores anyway
+        warnings.simplefilter("ignore", ConvergenceWarning)
+        clf.fit(train_x[:n_samples], train_y[:n_samples])
+    result = score_actions(dev_y, clf.predict(dev_x))
+    result.update(params=params, n_samples=n_samples,
+                  time=default_timer() - start)
+    return result
+
+
+def is_mmap_model(path):
+    """Check whether a path holds a model in the memory-mappable format.
+
+    :param str path: path to the model
+
+    :rtype: bool
+
+    """
+    return os.path.isfile(os.path.join(path, META_FNAME))
+
+
+def _save_array(path, array):
+    """Store an array in a new file (even if the old one is still mapped).
+
+    :param str path: path to the `.npy` file
+    :param np.array array: array to store
+
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as ofile:
+        np.save(ofile, array, allow_pickle=False)
+    # renaming keeps the old file alive for processes which still map it
+    os.rename(tmp_path, path)
 
 
 ##################################################################
 # Classes
 class Model(object):
-    def __init__(self, clf=None):
+    def __init__(self, clf=None, hash_width=None):
         """ Initialization
 
         :type clf: LinearSVC
         :param clf: a multiclass classifier or None
+        :param hash_width: number of columns into which features are
+          hashed (None means that every feature seen in the training data
+          gets its own column)
+        :type hash_width: int or None
         """
         classifier = clf or LinearSVC(C=DFLT_C, **DFLT_PARAMS)
-        self._clf = Pipeline([("vect", DictVectorizer()),
+        if hash_width is None:
+            vectorizer = DictVectorizer()
+        else:
+            vectorizer = TupleHasher(n_features=hash_width)
+        self._clf = Pipeline([("vect", vectorizer),
                               ("clf", classifier)])
         self._feat_extractor = FeatureExtractor()
         self._action2idx = {}
         self._idx2action = {}
+        self._form_rel_cnt = {}
+        self._actions = None
+        self._action_table = None
+        self._legal_masks = None
+        self._fallback_action = None
+        self._scorer = None
+        self._compact_weights = None
+        self._grid_results = None
 
     def reset(self):
         """Set all unpickable components to None.
 
         """
-        pass
+        self._init_vocabulary()
+        self._actions = None
+        self._action_table = None
+        self._legal_masks = None
+        self._fallback_action = None
+        self._scorer = None
+        self._feat_extractor.reset()
+        if getattr(self, "_compact_weights", None) is not None:
+            # only the compacted weights are pickled
+            self._clf.steps[-1][1].coef_ = None
 
     def restore(self):
         """Restore all components that were reset at pickling.
 
         """
-        pass
+        self._init_action_table()
+        self._feat_extractor.restore()
+        self._init_inference()
 
-    def train(self, train_x, train_y, grid_search=False):
+    def train(self, train_x, train_y, grid_search=False,
+              min_freq=DFLT_MIN_FREQ, max_features=None, param_grid=None,
+              n_jobs=1, halving_factor=None):
         """ Perform batch-learning on parsing model.
 
         :param list[tuple] x: list of training instances (3-tuples)
         :param list[tuple] y: list of gold classes
         :param bool grid_search: use grid search to optimize hyper-parameters
+        :param int min_freq: minimum number of training instances in which
+          a feature should occur to be kept in the vocabulary
+        :param max_features: maximum number of (the most frequent)
+          features to keep in the vocabulary
+        :type max_features: int or None
+        :param param_grid: candidate hyper-parameters of the classifier
+          in the format of :class:`sklearn.model_selection.ParameterGrid`
+          (:data:`DFLT_PARAM_GRID` if None)
+        :type param_grid: dict or list[dict] or None
+        :param int n_jobs: number of processes training the candidates of
+          the grid search
+        :param halving_factor: train all candidates of the grid search on
+          a part of the data first and only keep the best of every
+          `halving_factor` candidates for the next round with
+          `halving_factor` times as much data (None trains all candidates
+          on all data)
+        :type halving_factor: int or None
+
+        :raises ValueError: if the vocabulary of a model with hashed
+          features should be pruned
 
         """
         LOGGER.debug("Training internal model...")
+        prune = min_freq > 1 or max_features is not None
+        if prune and not isinstance(self._clf.steps[0][1], DictVectorizer):
+            raise ValueError("Vocabulary pruning is only applicable to"
+                             " models without feature hashing")
         # extract features
-        train_x = [self.extract_feats(*x_i) for x_i in train_x]
+        train_x = self._feat_extractor.extract_feats_many(train_x)
         train_y = self._digitize_labels(train_y)
         train_x, train_y, dev_x, dev_y = self._split_data(train_x, train_y)
+        if prune:
+            train_x, n_before, n_after = prune_features(
+                train_x, min_freq, max_features
+            )
+            LOGGER.info("Pruned vocabulary from %d to %d features",
+                        n_before, n_after)
+        if grid_search:
+            params = self._search_params(train_x, train_y, dev_x, dev_y,
+                                         param_grid or DFLT_PARAM_GRID,
+                                         n_jobs, halving_factor)
+            self._clf.set_params(**dict(("clf__" + name, value)
+                                        for name, value in iteritems(params)))
         self._clf.fit(train_x, train_y)
+        self._init_action_table()
+        self._feat_extractor.restore()
+        self._init_inference()
         dev_predicted = [self._clf.predict(x_i)[0] for x_i in dev_x]
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore", UndefinedMetricWarning)
-            precision = precision_score(dev_y, dev_predicted, average="macro")
-            recall = recall_score(dev_y, dev_predicted, average="macro")
-            macro_f1 = f1_score(dev_y, dev_predicted, average="macro")
-            micro_f1 = f1_score(dev_y, dev_predicted, average="micro")
+        self._report_dev(dev_y, dev_predicted)
+        LOGGER.debug("Internal model trained...")
+
+    def _search_params(self, train_x, train_y, dev_x, dev_y, param_grid,
+                       n_jobs=1, halving_factor=None):
+        """Find the hyper-parameters of the classifier with the best dev score.
+
+        Features are vectorized once, and all candidates are trained on
+        (prefixes of) the same matrix, which worker processes receive
+        when they are started (and share with the main process if they
+        are forked).  Candidates are ranked by :data:`GRID_METRIC`, and
+        their dev scores and training times are logged and stored in
+        :attr:`grid_results`.
+
+        :param list[dict] train_x: features of the training instances
+        :param list[int] train_y: classes of the training instances
+        :param list[dict] dev_x: features of the dev instances
+        :param list[int] dev_y: classes of the dev instances
+        :param param_grid: candidate hyper-parameters
+        :type param_grid: dict or list[dict]
+        :param int n_jobs: number of worker processes
+        :param halving_factor: reduction factor of successive halving
+          (None trains all candidates on all data)
+        :type halving_factor: int or None
+
+        :return: best hyper-parameters
+        :rtype: dict
+
+        """
+        vect = clone(self._clf.steps[0][1])
+        train_x = vect.fit_transform(train_x)
+        dev_x = vect.transform(dev_x)
+        train_y = np.asarray(train_y)
+        candidates = list(ParameterGrid(param_grid))
+        n_train = train_x.shape[0]
+        # numbers of training instances of the rounds of successive halving
+        budgets = [n_train]
+        if halving_factor is not None and halving_factor > 1:
+            n_rounds = int(math.ceil(math.log(len(candidates))
+                                     / math.log(halving_factor)))
+            budgets = [max(min(n_train, MIN_HALVING_SAMPLES),
+                           int(n_train / halving_factor ** i))
+                       for i in range(n_rounds - 1, -1, -1)] or budgets
+        LOGGER.info("Searching %d candidates in %d round(s) with %d"
+                    " process(es)...", len(candidates), len(budgets), n_jobs)
+        data = (self._clf.steps[-1][1], train_x, train_y, dev_x, dev_y)
+        if n_jobs > 1:
+            pool = multiprocessing.Pool(n_jobs, _init_grid_worker, (data,))
+            imap = pool.imap
+        else:
+            pool = None
+            _init_grid_worker(data)
+            imap = map
+        results = []
+        start = default_timer()
+        try:
+            for i, n_samples in enumerate(budgets):
+                round_results = list(imap(_fit_candidate,
+                                          [(params, n_samples)
+                                           for params in candidates]))
+                for result in round_results:
+                    result["round"] = i
+                    LOGGER.info(
+                        "%s: %d instances, %.2f s, precision: %.4f, recall:"
+                        " %.4f, macro-F1: %.4f, micro-F1: %.4f",
+                        ", ".join("{:s}={!r}".format(name, value)
+                                  for name, value in sorted(
+                                      iteritems(result["params"]))),
+                        n_samples, result["time"], result["precision"],
+                        result["recall"], result["macro_f1"],
+                        result["micro_f1"])
+                results.extend(round_results)
+                round_results.sort(key=lambda result: -result[GRID_METRIC])
+                n_keep = int(math.ceil(len(candidates)
+                                       / float(halving_factor or 1)))
+                candidates = [result["params"]
+                              for result in round_results[:n_keep]]
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+            _init_grid_worker(None)
+        self._grid_results = results
+        LOGGER.info("Grid search took %.2f s, best parameters: %r",
+                    default_timer() - start, candidates[0])
+        return candidates[0]
+
+    def train_online(self, samples, n_epochs=DFLT_N_EPOCHS,
+                     chunk_size=DFLT_CHUNK_SIZE, min_freq=DFLT_MIN_FREQ,
+                     max_features=None):
+        """Train the model on a stream of samples with an online learner.
+
+        Samples are read, vectorized, and learned in chunks, so that
+        only one chunk of feature dicts is kept in memory at a time.  The
+        first pass over the samples only collects the actions and (for
+        models without feature hashing) the vocabulary, each of the
+        following passes is an epoch of stochastic gradient descent, and
+        a final pass evaluates the model on every 15th sample, which is
+        held out as in :meth:`train`.  A classifier without
+        `partial_fit` (e.g., the default LinearSVC) is replaced by an
+        averaged linear SVM trained with SGD.
+
+        :param samples: re-iterable source of pairs of training instances
+          (3-tuples) and gold classes (e.g., a list or an object whose
+          `__iter__` re-reads the data)
+        :type samples: iterable[tuple]
+        :param int n_epochs: number of passes of the online learner
+        :param int chunk_size: number of samples vectorized and learned
+          at once
+        :param int min_freq: minimum number of training instances in which
+          a feature should occur to be kept in the vocabulary
+        :param max_features: maximum number of (the most frequent)
+          features to keep in the vocabulary
+        :type max_features: int or None
+
+        :raises ValueError: if the source of samples can only be read once
+          or if the vocabulary of a model with hashed features should be
+          pruned
+
+        """
+        LOGGER.debug("Training internal model online...")
+        if iter(samples) is samples:
+            raise ValueError("Online training needs a re-iterable source"
+                             " of samples")
+        vect = self._clf.steps[0][1]
+        use_vocab = isinstance(vect, DictVectorizer)
+        if (min_freq > 1 or max_features is not None) and not use_vocab:
+            raise ValueError("Vocabulary pruning is only applicable to"
+                             " models without feature hashing")
+        if not hasattr(self._clf.steps[-1][1], "partial_fit"):
+            self._clf.steps[-1] = ("clf", SGDClassifier(**DFLT_SGD_PARAMS))
+        clf = self._clf.steps[-1][1]
+        # collect actions and features of the training instances
+        counts = Counter()
+        n_train = 0
+        for train_x, train_y, _, dev_y in self._iter_chunks(samples,
+                                                            chunk_size):
+            # held-out actions need indices as well (as in :meth:`train`,
+            # which digitizes all labels before splitting the data)
+            self._digitize_labels(train_y)
+            self._digitize_labels(dev_y)
+            n_train += len(train_y)
+            if use_vocab:
+                for feats_i in self._feat_extractor.extract_feats_many(
+                        train_x):
+                    counts.update(iter(feats_i))
+                # documents are re-read in every pass, so that their
+                # cached node features will not be used again
+                self._feat_extractor.clear_cache()
+        if use_vocab:
+            keep = _select_features(counts, min_freq, max_features)
+            LOGGER.info("Pruned vocabulary from %d to %d features",
+                        len(counts), len(keep))
+            vect.fit([dict.fromkeys(keep, 1)])
+        del counts
+        classes = np.arange(len(self._action2idx))
+        for epoch in range(n_epochs):
+            for train_x, train_y, _, _ in self._iter_chunks(samples,
+                                                            chunk_size):
+                if not train_y:
+                    continue
+                train_x = vect.transform(
+                    self._feat_extractor.extract_feats_many(train_x))
+                train_y = np.array([self._action2idx[y] for y in train_y])
+                order = np.random.permutation(len(train_y))
+                clf.partial_fit(train_x[order], train_y[order],
+                                classes=classes)
+                self._feat_extractor.clear_cache()
+            LOGGER.info("Finished epoch %d of %d (%d instances)", epoch + 1,
+                        n_epochs, n_train)
+        self._init_action_table()
+        self._feat_extractor.restore()
+        self._init_inference()
+        dev_y = []
+        dev_predicted = []
+        for _, _, dev_x, dev_y_i in self._iter_chunks(samples, chunk_size):
+            if dev_x:
+                dev_y.extend(self._action2idx[y] for y in dev_y_i)
+                dev_predicted.extend(self._clf.predict(
+                    self._feat_extractor.extract_feats_many(dev_x)))
+                self._feat_extractor.clear_cache()
+        self._report_dev(dev_y, dev_predicted)
+        LOGGER.debug("Internal model trained online...")
+
+    @staticmethod
+    def _iter_chunks(samples, chunk_size):
+        """Split a stream of samples into chunks of held-out and training data.
+
+        Every 15th sample is held out as in :meth:`_split_data`.
+
+        :param iterable[tuple] samples: pairs of instances and gold classes
+        :param int chunk_size: number of samples per chunk
+
+        :return: iterator over training instances, training classes,
+          held-out instances, and held-out classes of each chunk
+        :rtype: iterator[tuple(list, list, list, list)]
+
+        """
+        stream = enumerate(samples)
+        while True:
+            chunk = list(islice(stream, chunk_size))
+            if not chunk:
+                return
+            train_x, train_y, dev_x, dev_y = [], [], [], []
+            for i, (x_i, y_i) in chunk:
+                if i % DEV_STEP:
+                    train_x.append(x_i)
+                    train_y.append(y_i)
+                else:
+                    dev_x.append(x_i)
+                    dev_y.append(y_i)
+            yield train_x, train_y, dev_x, dev_y
+
+    @staticmethod
+    def _report_dev(dev_y, dev_predicted):
+        """Log the performance on the held-out instances.
+
+        :param list[int] dev_y: gold classes
+        :param list[int] dev_predicted: predicted classes
+
+        """
+        scores = score_actions(dev_y, dev_predicted)
         LOGGER.info("Performance on the dev set: precision: %.4f, "
                     "recall: %.4f, macro-F1: %.4f, micro-F1: %.4f",
-                    precision, recall, macro_f1, micro_f1)
-        LOGGER.debug("Internal model trained...")
+                    scores["precision"], scores["recall"],
+                    scores["macro_f1"], scores["micro_f1"])
 
     def predict(self, stack_node1, stack_node2, queue_node, conll):
         """Predict parsing action for a given set of features.
@@ -99,16 +598,485 @@ class Model(object):
         :param conll: conll document
         :type conll: CoNLLDoc
 
-        :return: list of predicted decisions sorted in descending order of
-          their scores
+        :return: index of the best-scoring valid action in :attr:`actions`
+          or -1 if no action is valid
+        :rtype: int
 
         """
-        feats = self.extract_feats(stack_node1, stack_node2, queue_node, conll)
-        scores = self._clf.decision_function(feats)
-        score_idcs = np.flip(np.argsort(scores)[0], axis=-1)
-        classes = self._clf.classes_
-        ret = [self._idx2action[classes[i]] for i in score_idcs]
-        return ret
+        scores = self.decision_function(
+            [(stack_node1, stack_node2, queue_node, conll)]
+        )
+        # the stack has at least two nodes iff the second one is present
+        mask = self.legal_mask(2 if stack_node2 is not None else 1,
+                               int(queue_node is not None))
+        return self.best_action(scores[0], mask)
+
+    @staticmethod
+    def best_action(scores, mask):
+        """Find the best-scoring action among the valid ones.
+
+        :param np.array scores: scores of all actions
+        :param np.array mask: boolean mask of valid actions
+
+        :return: index of the best valid action or -1 if no action is valid
+        :rtype: int
+
+        """
+        if not mask.any():
+            return -1
+        return int(np.where(mask, scores, -np.inf).argmax())
+
+    def decision_function(self, samples):
+        """Compute action scores for a batch of parser states at once.
+
+        All states are vectorized at once, so the classifier is invoked
+        only once regardless of the batch size.  Models with a feature
+        vocabulary are applied with their exported weights
+        (:attr:`scorer`).
+
+        :param list[tuple] samples: parser states (4-tuples of the
+          first and second stack nodes, the first queue node, and the
+          CoNLL document)
+
+        :return: matrix of scores (one row per sample, one column per
+          action from :attr:`actions`)
+        :rtype: np.array
+
+        """
+        if self._scorer is not None:
+            scores = self._scorer.score(
+                *self._feat_extractor.extract_cols(samples,
+                                                   self._scorer.vocab)
+            )
+            if scores.shape[1] == 1:
+                scores = scores[:, 0]
+        else:
+            feats = self._feat_extractor.extract_feats_many(samples)
+            scores = self._clf.decision_function(feats)
+        if scores.ndim == 1:
+            # binary classifiers only return scores for the positive class
+            scores = np.column_stack((-scores, scores))
+        return scores
+
+    @property
+    def feat_extractor(self):
+        """Get extractor of features from parser states.
+
+        :rtype: rstparser.feature.FeatureExtractor
+
+        """
+        return self._feat_extractor
+
+    @property
+    def grid_results(self):
+        """Get results of the last grid search.
+
+        :return: hyper-parameters (`params`), round of successive halving
+          (`round`), number of training instances (`n_samples`), fitting
+          time in seconds (`time`), and dev scores (`precision`, `recall`,
+          `macro_f1`, and `micro_f1`) of every trained candidate or None
+          if no grid search was run
+        :rtype: list[dict] or None
+
+        """
+        return getattr(self, "_grid_results", None)
+
+    @property
+    def scorer(self):
+        """Get exported weights used for prediction.
+
+        :return: scorer or None if predictions go through the pipeline
+        :rtype: LinearScorer or None
+
+        """
+        return self._scorer
+
+    @property
+    def actions(self):
+        """Get parsing actions in the order of classifier's columns.
+
+        :return: list of action tuples
+        :rtype: list[tuple]
+
+        """
+        return self._actions
+
+    @property
+    def action_table(self):
+        """Get integer codes of parsing actions.
+
+        :return: matrix with one row per classifier's column, holding
+          the action type (SHIFT or REDUCE), the index of the form in
+          FORMS, and the index of the relation (-1 for shifts)
+        :rtype: np.array
+
+        """
+        return self._action_table
+
+    @property
+    def fallback_action(self):
+        """Get reduce action to use when a tree has to be completed cheaply.
+
+        :return: the most frequent nucleus-satellite reduce action of the
+          training data
+        :rtype: tuple
+
+        """
+        return self._fallback_action
+
+    def legal_mask(self, n_stack, n_queue):
+        """Get boolean mask of actions that are valid in the given state.
+
+        :param int n_stack: number of nodes on the stack
+        :param int n_queue: number of nodes in the queue
+
+        :return: boolean mask over classifier's columns
+        :rtype: np.array
+
+        """
+        return self._legal_masks[int(n_stack > 1), int(n_queue > 0)]
+
+    def compact(self, quantize=None, threshold=0.):
+        """Drop features without weights and compress the weight matrix.
+
+        The vocabulary is restricted to the features which have a
+        non-zero weight for at least one class, and the remaining
+        weights are stored (and pickled) in the CSR format.
+
+        :param quantize: type in which to store the weights ("float16",
+          "int8", or None to keep float64)
+        :type quantize: str or None
+        :param float threshold: weights whose absolute value does not
+          exceed this threshold are set to zero beforehand
+
+        :return: numbers of features before and after compaction
+        :rtype: tuple(int, int)
+
+        :raises ValueError: if the model is not trained or has no
+          feature vocabulary (e.g., uses feature hashing)
+
+        """
+        self._init_vocabulary()
+        vect = self._clf.steps[0][1]
+        coef = self._get_coef()
+        if not isinstance(vect, DictVectorizer) \
+           or not hasattr(vect, "vocabulary_") or coef is None:
+            raise ValueError("Only trained models with a feature vocabulary"
+                             " can be compacted")
+        coef = np.where(np.abs(coef) > threshold, coef, 0.)
+        support = (coef != 0).any(axis=0)
+        n_before = coef.shape[1]
+        vect.restrict(support)
+        self._compact_weights = SparseWeights.from_dense(coef[:, support],
+                                                         quantize)
+        # only the compacted weights are kept
+        self._clf.steps[-1][1].coef_ = None
+        n_after = self._compact_weights.shape[1]
+        # column indices of the cached features have changed
+        self._feat_extractor.restore()
+        self._init_inference()
+        LOGGER.info("Compacted model from %d to %d features (%d weights)",
+                    n_before, n_after, self._compact_weights.nnz)
+        return n_before, n_after
+
+    def export(self, dtype=SCORE_DTYPE):
+        """Export weights, bias, and feature index of the classifier.
+
+        :param type dtype: type in which the scores are accumulated
+
+        :return: scorer equivalent to the decision function of the model
+          (compacted models keep their quantized type)
+        :rtype: LinearScorer
+
+        :raises ValueError: if the model is not trained, has no feature
+          vocabulary (e.g., uses feature hashing), or is not linear
+
+        """
+        compact_weights = getattr(self, "_compact_weights", None)
+        if compact_weights is None:
+            return LinearScorer.from_pipeline(self._clf, dtype)
+        self._init_vocabulary()
+        return LinearScorer.from_compact(
+            self._clf.steps[0][1].vocabulary_, compact_weights,
+            np.ravel(self._clf.steps[-1][1].intercept_), dtype)
+
+    def save_mmap(self, path):
+        """Store the model in the memory-mappable format.
+
+        The model becomes a directory with the weight matrix (one row per
+        feature) and the bias in `.npy` files, the values of templated
+        features in a text file (one line per column, so that each
+        template's values are sorted and its prefix is only stored in the
+        metadata), and everything else in a JSON file of metadata.  The
+        metadata file is written last, so that incomplete directories are
+        not taken for models.  Compacted models store the arrays of their
+        sparse (and possibly quantized) weights instead of the dense
+        matrix.
+
+        :param str path: directory in which to store the model
+
+        :raises ValueError: if the model is not trained or if its feature
+          names cannot be stored as lines of text
+
+        """
+        self._init_vocabulary()
+        vect = self._clf.steps[0][1]
+        clf = self._clf.steps[-1][1]
+        compact_weights = getattr(self, "_compact_weights", None)
+        coef = compact_weights
+        if coef is None:
+            coef = self._get_coef()
+        if coef is None or not hasattr(clf, "classes_"):
+            raise ValueError("Only trained models can be saved in the"
+                             " memory-mappable format")
+        meta = {"format": MMAP_FORMAT,
+                "version": MMAP_VERSION,
+                "n_features": coef.shape[1],
+                "classes": [int(c) for c in clf.classes_],
+                "actions": [list(self._idx2action[i])
+                            for i in range(len(self._idx2action))],
+                "form_rel_cnt": sorted(
+                    [form, rel, cnt]
+                    for (form, rel), cnt in iteritems(
+                        getattr(self, "_form_rel_cnt", None) or {})),
+                "feature_groups": list(self._feat_extractor.groups),
+                "cache_size": self._feat_extractor.cache_size}
+        embeddings = self._feat_extractor.embeddings
+        meta["embeddings"] = None if embeddings is None else embeddings.path
+        meta["sparse"] = None
+        if compact_weights is not None:
+            meta["sparse"] = {"dtype": compact_weights.data.dtype.name,
+                              "scaled": compact_weights.scale is not None}
+        values = None
+        if isinstance(vect, TupleHasher):
+            meta["hash_width"] = vect.n_features
+            meta["alternate_sign"] = vect.alternate_sign
+        else:
+            meta["hash_width"] = None
+            fixed, runs, values = FrozenVocabulary(
+                vect.vocabulary_).to_columns()
+            if not all(isinstance(value, string_types) and "\n" not in value
+                       for value in values):
+                raise ValueError("Feature values must be strings without"
+                                 " line breaks")
+            meta["fixed"] = sorted([col] + list(name)
+                                   for name, col in iteritems(fixed))
+            meta["templates"] = [[list(prefix), start, stop]
+                                 for prefix, start, stop in runs]
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        if compact_weights is None:
+            _save_array(os.path.join(path, WEIGHTS_FNAME),
+                        np.ascontiguousarray(coef.T, dtype=SCORE_DTYPE))
+        else:
+            for name, fname in iteritems(SPARSE_FNAMES):
+                array = getattr(compact_weights, name)
+                if array is not None:
+                    _save_array(os.path.join(path, fname), array)
+        _save_array(os.path.join(path, BIAS_FNAME),
+                    np.ravel(clf.intercept_).astype(SCORE_DTYPE))
+        if values is not None:
+            with codecs.open(os.path.join(path, FEATURES_FNAME), 'w',
+                             DFLT_ENCODING) as ofile:
+                ofile.write("\n".join(values))
+        with codecs.open(os.path.join(path, META_FNAME), 'w',
+                         DFLT_ENCODING) as ofile:
+            ofile.write(json.dumps(meta, ensure_ascii=False, indent=1,
+                                   sort_keys=True))
+
+    @classmethod
+    def load_mmap(cls, path, mmap_mode="r"):
+        """Load a model stored in the memory-mappable format.
+
+        The weight matrix is mapped rather than read, so that loading
+        does not depend on its size and processes which load the same
+        model share its pages.  (The sparse weights of compacted models
+        are expanded into a matrix with one row per feature for scoring,
+        which keeps their quantized type.)  No file is unpickled.
+
+        :param str path: directory of the model
+        :param mmap_mode: mode in which the weights are mapped (None
+          reads them into memory)
+        :type mmap_mode: str or None
+
+        :return: loaded model
+        :rtype: Model
+
+        :raises ValueError: if the format or the version of the model is
+          not supported or if its files do not match
+
+        """
+        with codecs.open(os.path.join(path, META_FNAME), 'r',
+                         DFLT_ENCODING) as ifile:
+            meta = json.load(ifile)
+        if meta.get("format") != MMAP_FORMAT \
+           or meta.get("version", MMAP_VERSION + 1) > MMAP_VERSION:
+            raise ValueError(
+                "Unsupported model format {!r} (version {!r}) in {!r}".format(
+                    meta.get("format"), meta.get("version"), path))
+        bias = np.load(os.path.join(path, BIAS_FNAME), allow_pickle=False)
+        compact_weights = None
+        if meta.get("sparse") is None:
+            # plain array views avoid the overhead of memmap objects
+            weights = np.asarray(np.load(
+                os.path.join(path, WEIGHTS_FNAME), mmap_mode=mmap_mode,
+                allow_pickle=False))
+        else:
+            arrays = dict(
+                (name, np.asarray(np.load(os.path.join(path, fname),
+                                          mmap_mode=mmap_mode,
+                                          allow_pickle=False)))
+                for name, fname in iteritems(SPARSE_FNAMES)
+                if name != "scale" or meta["sparse"]["scaled"]
+            )
+            if arrays["data"].dtype.name != meta["sparse"]["dtype"]:
+                raise ValueError(
+                    "Weights of {!r} are not of type {!r}".format(
+                        path, meta["sparse"]["dtype"]))
+            if arrays["indptr"].shape != (bias.shape[0] + 1,):
+                raise ValueError(
+                    "Sparse weights of {!r} do not match {:d} classes".format(
+                        path, bias.shape[0]))
+            compact_weights = SparseWeights(
+                shape=(bias.shape[0], meta["n_features"]), **arrays)
+        if compact_weights is None \
+           and weights.shape != (meta["n_features"], bias.shape[0]):
+            raise ValueError(
+                "Weight matrix of shape {!r} does not match {:d} features"
+                " and {:d} classes".format(weights.shape, meta["n_features"],
+                                           bias.shape[0]))
+        model = cls(hash_width=meta["hash_width"])
+        vect = model._clf.steps[0][1]
+        vocab = None
+        if meta["hash_width"] is None:
+            with codecs.open(os.path.join(path, FEATURES_FNAME), 'r',
+                             DFLT_ENCODING) as ifile:
+                values = ifile.read().split("\n")
+            if len(values) != meta["n_features"]:
+                raise ValueError(
+                    "Feature index of {!r} does not match the weights".format(
+                        path))
+            vocab = FrozenVocabulary.from_columns(
+                ((tuple(entry[1:]), entry[0]) for entry in meta["fixed"]),
+                meta["templates"], values
+            )
+        else:
+            vect.set_params(alternate_sign=meta["alternate_sign"])
+        clf = model._clf.steps[-1][1]
+        # compacted models only keep their sparse weights
+        clf.coef_ = None if compact_weights is not None else weights.T
+        clf.intercept_ = bias
+        model._compact_weights = compact_weights
+        clf.classes_ = np.array(meta["classes"])
+        clf.n_features_in_ = meta["n_features"]
+        model._action2idx = dict((tuple(action), i)
+                                 for i, action in enumerate(meta["actions"]))
+        model._idx2action = dict((i, action)
+                                 for action, i in iteritems(model._action2idx))
+        model._form_rel_cnt = dict(((form, rel), cnt)
+                                   for form, rel, cnt in meta["form_rel_cnt"])
+        embeddings = meta["embeddings"]
+        model._feat_extractor = FeatureExtractor(
+            meta["cache_size"], meta["feature_groups"],
+            None if embeddings is None else Embeddings(embeddings)
+        )
+        model._init_action_table()
+        if vocab is not None:
+            # the vocabulary of the DictVectorizer is only built when it is
+            # needed (see :meth:`_init_vocabulary`)
+            if compact_weights is not None:
+                model._scorer = LinearScorer.from_compact(
+                    vocab, compact_weights, bias, SCORE_DTYPE)
+            else:
+                model._scorer = LinearScorer(vocab, weights, bias,
+                                             SCORE_DTYPE)
+        return model
+
+    def _get_coef(self):
+        """Get the dense weight matrix of the classifier.
+
+        Compacted models only keep their sparse weights, which are
+        expanded here.
+
+        :return: weights (one row per class) or None if the classifier is
+          not trained
+        :rtype: np.array or None
+
+        """
+        compact_weights = getattr(self, "_compact_weights", None)
+        if compact_weights is not None:
+            return compact_weights.toarray()
+        coef = getattr(self._clf.steps[-1][1], "coef_", None)
+        if hasattr(coef, "toarray"):
+            coef = coef.toarray()
+        return coef
+
+    def _init_vocabulary(self):
+        """Rebuild the vocabulary of the vectorizer from the scorer.
+
+        Models loaded from the memory-mappable format only index their
+        features for the scorer, since the pipeline's DictVectorizer is
+        not needed for prediction.
+
+        """
+        vect = self._clf.steps[0][1]
+        if isinstance(vect, DictVectorizer) \
+           and not hasattr(vect, "vocabulary_") and self._scorer is not None:
+            names = self._scorer.vocab.feature_names()
+            vect.feature_names_ = names
+            vect.vocabulary_ = dict(zip(names, range(len(names))))
+
+    def _init_inference(self):
+        """Export the classifier for direct scoring of feature columns.
+
+        This is only possible for pipelines of a DictVectorizer and a
+        linear classifier.  Otherwise, predictions go through the
+        pipeline.
+
+        """
+        self._scorer = None
+        if isinstance(self._clf.steps[0][1], DictVectorizer):
+            try:
+                self._scorer = self.export()
+            except ValueError:
+                pass
+
+    def _init_action_table(self):
+        """Precompute integer codes and legality masks of parsing actions.
+
+        """
+        classes = getattr(self._clf, "classes_", None)
+        if classes is None:
+            return
+        self._actions = [self._idx2action[c] for c in classes]
+        relations = sorted(set(rel for act, _, rel in self._actions
+                               if act == "reduce"))
+        rel2idx = {rel: i for i, rel in enumerate(relations)}
+        self._action_table = np.full((len(self._actions), 3), -1,
+                                     dtype=np.int32)
+        for i, (act, form, rel) in enumerate(self._actions):
+            if act == "shift":
+                self._action_table[i, 0] = SHIFT
+            else:
+                self._action_table[i] = (REDUCE, FORMS.index(form),
+                                         rel2idx[rel])
+        is_shift = self._action_table[:, 0] == SHIFT
+        is_reduce = ~is_shift
+        # prefer the most frequent NS reduction as the fallback action
+        form_rel_cnt = getattr(self, "_form_rel_cnt", None) or {}
+        reduce_actions = sorted(
+            (form != "NS", -form_rel_cnt.get((form, rel), 0), i)
+            for i, (act, form, rel) in enumerate(self._actions)
+            if act == "reduce"
+        )
+        self._fallback_action = None
+        if reduce_actions:
+            self._fallback_action = self._actions[reduce_actions[0][-1]]
+        # legal masks indexed by (can reduce, can shift)
+        self._legal_masks = np.array(
+            [[np.zeros_like(is_shift), is_shift],
+             [is_reduce, is_shift | is_reduce]]
+        )
 
     def extract_feats(self, stack_node1, stack_node2,
                       queue_node, tree):
@@ -137,10 +1105,14 @@ class Model(object):
 
         """
         ret = []
+        form_rel_cnt = self._form_rel_cnt
         for action_i in train_y:
             if action_i not in self._action2idx:
                 self._action2idx[action_i] = len(self._action2idx)
             ret.append(self._action2idx[action_i])
+            if action_i[0] == "reduce":
+                form_rel = action_i[1:]
+                form_rel_cnt[form_rel] = form_rel_cnt.get(form_rel, 0) + 1
         self._idx2action = {v: k for k, v in iteritems(self._action2idx)}
         return ret
 
@@ -149,7 +1121,7 @@ class Model(object):
 
         """
         n = len(train_x)
-        n_dev = int(n / 15)
+        n_dev = int(n / DEV_STEP)
         idcs = list(range(n))
         np.random.shuffle(idcs)
 
@@ -5,6 +5,8 @@
 # Imports
 from __future__ import absolute_import, print_function, unicode_literals
 from future.utils import python_2_unicode_compatible
+from six import string_types
+from six.moves import range
 
 
 ##################################################################
@@ -21,7 +23,9 @@ class SpanNode(object):
                      Only two possible values: Nucleus or Satellite
         """
         # Text of this span / Discourse relation
-        self.text, self.relation = None, None
+        self._text, self.relation = None, None
+        # First and last global token index of this span
+        self.tokspan = None
         # EDU span / Nucleus span (begin, end) index
         self.eduspan, self.nucspan = None, None
         # Nucleus single EDU
@@ -38,30 +42,77 @@ class SpanNode(object):
         self.nodelist = []
         # Relation form: NN, NS, SN
         self.form = None
+        # Whether the tree was completed by a fallback strategy
+        self.degraded = False
+
+    @property
+    def text(self):
+        """Token indices of this span (or raw text of a dis leaf).
+
+        Unless a span was explicitly assigned a non-contiguous list of
+        token indices, its text is a lazy range view over `tokspan`.
+
+        """
+        if self._text is not None or self.tokspan is None:
+            return self._text
+        return range(self.tokspan[0], self.tokspan[1] + 1)
+
+    @text.setter
+    def text(self, text):
+        """Set text of this span.
+
+        :param text: raw text or list of global token indices
+        :type text: str or list[int] or None
+
+        """
+        if text is None or isinstance(text, string_types):
+            self._text = text
+            self.tokspan = None
+        elif len(text) == 0:
+            self._text = []
+            self.tokspan = None
+        else:
+            self.tokspan = (text[0], text[-1])
+            if isinstance(text, range) \
+               or list(text) == list(range(text[0], text[-1] + 1)):
+                self._text = None
+            else:
+                self._text = list(text)
 
     def to_str(self, conll_doc, indent=0):
         """Return string representation of the given node in DIS format.
 
         """
-        prfx = "  " * indent
-        if self.prop:
-            ret = '(' + self.prop + '\n'
-        else:
-            ret = "(Root\n"
-        if self.lnode is None and self.rnode is None:
-            ret += prfx + "(leaf " + str(self.eduspan[0]) + ")\n"
-        else:
-            ret += prfx + "(span " + ' '.join(
-                str(i) for i in self.eduspan) + ")\n"
-        if self.relation:
-            ret += prfx + "(rel2par " + self.relation + ")\n"
-        if self.lnode:
-            ret += prfx + self.lnode.to_str(conll_doc, indent=indent + 1)
-        if self.rnode:
-            ret += prfx + self.rnode.to_str(conll_doc, indent=indent + 1)
-        if self.lnode is None and self.rnode is None:
-            tokendict = conll_doc.tokendict
-            ret += prfx + "(text _!" + ' '.join(tokendict[i].word
-                                                for i in self.text) + "_!)\n"
-        ret += prfx + ")\n"
-        return ret
+        tokendict = conll_doc.tokendict
+        ret = []
+        # pending nodes (with their indentation) and strings
+        todo = [(self, indent)]
+        while todo:
+            item = todo.pop()
+            if not isinstance(item, tuple):
+                ret.append(item)
+                continue
+            node, indent = item
+            prfx = "  " * indent
+            if node.prop:
+                ret.append('(' + node.prop + '\n')
+            else:
+                ret.append("(Root\n")
+            if node.lnode is None and node.rnode is None:
+                ret.append(prfx + "(leaf " + str(node.eduspan[0]) + ")\n")
+            else:
+                ret.append(prfx + "(span " + ' '.join(
+                    str(i) for i in node.eduspan) + ")\n")
+            if node.relation:
+                ret.append(prfx + "(rel2par " + node.relation + ")\n")
+            tail = []
+            if node.lnode:
+                tail += [prfx, (node.lnode, indent + 1)]
+            if node.rnode:
+                tail += [prfx, (node.rnode, indent + 1)]
+            if node.lnode is None and node.rnode is None:
+                tail.append(prfx + "(text _!" + ' '.join(
+                    tokendict[i].word for i in node.text) + "_!)\n")
+            tail.append(prfx + ")\n")
+            todo.extend(reversed(tail))
+        return ''.join(ret)
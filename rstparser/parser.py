@@ -18,15 +18,27 @@ try:
     from cPickle import dump, load
 except ImportError:
     from _pickle import dump, load
+try:
+    from time import monotonic as clock
+except ImportError:
+    from time import time as clock
+from collections import deque
+from threading import Lock
+
+import numpy as np
 
-from .model import Model
+from .model import (DFLT_CHUNK_SIZE, DFLT_MIN_FREQ, DFLT_N_EPOCHS, SHIFT,
+                    Model, is_mmap_model, log_softmax)
+from .trace import ActionTrace, TraceSpan
 from .node import SpanNode
 from .exceptions import ActionError, ParseError
-from .utils import LOGGER
+from .utils import LOGGER, merge_texts
 
 
 ##################################################################
 # Constants
+DFLT_BEAM_SIZE = 1
+SHIFT_ACTION = ("shift", None, None)
 
 
 ##################################################################
@@ -34,20 +46,36 @@ from .utils import LOGGER
 class RSTParser(object):
     """Shift-reduce rhetorical structure parser.
 
+    Parsing methods keep their stacks and queues local to each call and
+    only read the loaded model, so that one parser instance can be
+    shared by multiple threads.  The internal stack and queue are only
+    used by :meth:`operate`.
+
     """
-    def __init__(self, queue, stack, mpath=None):
+    def __init__(self, queue=None, stack=None, mpath=None, hash_width=None):
         """Class constructor.
 
-        :param list queue: EDUs to be processed
+        :param queue: EDUs to be processed (lists are copied into a
+          deque)
+        :type queue: collections.deque or list or None
         :param list stack: currently processed EDUs
         :param str mpath: path to pretrained model
+        :param hash_width: number of columns into which features of a
+          new model are hashed (None means no hashing)
+        :type hash_width: int or None
 
         """
-        self._queue = queue
-        self._stack = stack
+        if isinstance(queue, deque):
+            self._queue = queue
+        else:
+            self._queue = deque(queue or ())
+        self._stack = [] if stack is None else stack
         self._mpath = mpath
+        # number of parsed and of fallback-completed documents
+        self.stats = {"parsed": 0, "degraded": 0}
+        self._stats_lock = Lock()
         if mpath is None:
-            self._model = Model()
+            self._model = Model(hash_width=hash_width)
         else:
             self.load(mpath)
 
@@ -61,6 +89,28 @@ class RSTParser(object):
         """
         return self._stack
 
+    @property
+    def feat_extractor(self):
+        """Get extractor of features of the internal model.
+
+        :rtype: rstparser.feature.FeatureExtractor
+
+        """
+        return self._model.feat_extractor
+
+    @property
+    def grid_results(self):
+        """Get results of the last grid search of the internal model.
+
+        :return: hyper-parameters, round of successive halving, number
+          of training instances, fitting time, and dev scores of every
+          trained candidate or None if no grid search was run (see
+          :attr:`rstparser.model.Model.grid_results`)
+        :rtype: list[dict] or None
+
+        """
+        return self._model.grid_results
+
     @property
     def queue(self):
         """Get internal queue of states which need to be processed.
@@ -71,11 +121,27 @@ class RSTParser(object):
         """
         return self._queue
 
-    def train(self, rst_trees):
+    def train(self, rst_trees, min_freq=DFLT_MIN_FREQ, max_features=None,
+              grid_search=False, param_grid=None, n_jobs=1,
+              halving_factor=None):
         """Train internal model on the provided data.
 
         :param rst_tree: list of RST trees
         :type data: list[rstparser.tree.RSTTree]
+        :param int min_freq: minimum number of training instances in which
+          a feature should occur to be kept in the vocabulary
+        :param max_features: maximum number of (the most frequent)
+          features to keep in the vocabulary
+        :type max_features: int or None
+        :param bool grid_search: choose hyper-parameters of the classifier
+          by their performance on held-out data
+        :param param_grid: candidate hyper-parameters (see
+          :meth:`rstparser.model.Model.train`)
+        :type param_grid: dict or list[dict] or None
+        :param int n_jobs: number of processes of the grid search
+        :param halving_factor: reduction factor of successive halving in
+          the grid search (None trains all candidates on all data)
+        :type halving_factor: int or None
 
         """
         LOGGER.debug("rst_trees: %r", rst_trees)
@@ -85,65 +151,463 @@ class RSTParser(object):
             t_actions, t_samples = tree.generate_samples()
             actions.extend(t_actions)
             samples.extend(t_samples)
-        self._model.train(samples, actions)
+        self._model.train(samples, actions, grid_search=grid_search,
+                          min_freq=min_freq, max_features=max_features,
+                          param_grid=param_grid, n_jobs=n_jobs,
+                          halving_factor=halving_factor)
+
+    def train_online(self, rst_trees, n_epochs=DFLT_N_EPOCHS,
+                     chunk_size=DFLT_CHUNK_SIZE, min_freq=DFLT_MIN_FREQ,
+                     max_features=None):
+        """Train internal model on a stream of RST trees.
+
+        Unlike :meth:`train`, training samples are generated tree by tree
+        and learned in chunks by an online learner, so that neither all
+        trees nor all samples need to fit into memory.
+
+        :param rst_trees: re-iterable source of RST trees (e.g., a list or
+          an object whose `__iter__` re-reads the trees from disk), which
+          is read once per epoch and for two extra passes
+        :type rst_trees: iterable[rstparser.tree.RSTTree]
+        :param int n_epochs: number of passes of the online learner
+        :param int chunk_size: number of samples vectorized and learned
+          at once
+        :param int min_freq: minimum number of training instances in which
+          a feature should occur to be kept in the vocabulary
+        :param max_features: maximum number of (the most frequent)
+          features to keep in the vocabulary
+        :type max_features: int or None
+
+        :raises ValueError: if the trees can only be read once
 
-    def parse(self, queue, conll_doc):
+        """
+        if iter(rst_trees) is rst_trees:
+            raise ValueError("Online training needs a re-iterable source"
+                             " of RST trees")
+        self._model.train_online(TreeSamples(rst_trees), n_epochs=n_epochs,
+                                 chunk_size=chunk_size, min_freq=min_freq,
+                                 max_features=max_features)
+
+    def parse(self, queue, conll_doc, beam_size=DFLT_BEAM_SIZE,
+              prefix_cache=None, deadline=None):
         """Construst an RST tree from a list of EDU nodes.
 
         :param list[SpanNode] queue: list of input EDUs
         :param CoNLLDoc conll_doc: list of input EDUs
+        :param int beam_size: number of best partial configurations to
+          keep at each step (1 means greedy decoding)
+        :param prefix_cache: checkpoints of previous greedy parses from
+          which documents with the same EDU prefix resume parsing (a
+          cache created with `exact=False` also lets grown or truncated
+          documents resume, but their parses may then differ from fresh
+          ones; an exact cache only serves documents with the same
+          number of EDUs)
+        :type prefix_cache: rstparser.cache.PrefixCache or None
+        :param deadline: time budget in seconds, after which (or after
+          an action error) the tree is completed by right-branching
+          reduces; such trees have their `degraded` flag set
+        :type deadline: float or None
 
         """
-        if self.queue or self.stack:
-            LOGGER.warn(
-                "Attempting to parse with non-empty queue and stack."
-            )
-            self.reset()
-        self._queue = queue
-        while not self._endparsing():
-            # Generate features
-            stack_node1 = None if len(self.stack) < 1 else self.stack[-1]
-            stack_node2 = None if len(self.stack) < 2 else self.stack[-2]
-            queue_node = queue[0] if queue else None
-            actions = self._model.predict(stack_node1, stack_node2,
-                                          queue_node, conll_doc)
-            for action in actions:
-                try:
-                    self.operate(action)
-                    break
-                except ActionError:
-                    # print "Parsing action error with {}".format(action)
-                    pass
+        end_time = None if deadline is None else clock() + deadline
+        tree = self._parse(queue, conll_doc, beam_size, prefix_cache,
+                           end_time)
+        with self._stats_lock:
+            self.stats["parsed"] += 1
+            self.stats["degraded"] += tree.degraded
+        return tree
+
+    def _parse(self, queue, conll_doc, beam_size=DFLT_BEAM_SIZE,
+               prefix_cache=None, end_time=None):
+        """Construct an RST tree without updating stats.
+
+        :param list[SpanNode] queue: list of input EDUs
+        :param CoNLLDoc conll_doc: CoNLL document
+        :param int beam_size: number of best partial configurations to
+          keep at each step
+        :param prefix_cache: checkpoints of previous greedy parses
+        :type prefix_cache: rstparser.cache.PrefixCache or None
+        :param end_time: clock time after which the tree is completed by
+          right-branching reduces
+        :type end_time: float or None
+
+        :return: root of the RST tree
+        :rtype: SpanNode
+
+        """
+        edus = list(queue)
+        queue = deque(edus)
+        stack = []
+        keys = None
+        actions = []
+        if beam_size > 1:
+            actions = self._beam_search(edus, conll_doc, beam_size,
+                                        end_time)
+        elif prefix_cache is not None:
+            keys = prefix_cache.get_prefix_keys(queue, conll_doc)
+            _, actions = prefix_cache.lookup(keys)
+        # replaying found actions does not require any predictions
+        for action in actions:
+            self._operate(queue, stack, action)
+        degraded = False
+        while not self._endparsing(queue, stack):
+            if end_time is not None and clock() >= end_time:
+                degraded = True
+                break
+            try:
+                actions.append(self._model.actions[
+                    self._predict_step(queue, stack, conll_doc)
+                ])
+            except ActionError:
+                if end_time is None:
+                    raise
+                degraded = True
+                break
+        if keys is not None:
+            prefix_cache.store(keys, actions)
+        if degraded:
+            self._complete_tree(queue, stack)
+        tree = self._getparsetree(queue, stack)
+        tree.degraded = degraded
+        return tree
+
+    def _complete_tree(self, queue, stack):
+        """Finish parsing with cheap right-branching reduces.
+
+        All remaining EDUs are shifted, and the stack is then reduced
+        from the top using the model's fallback action.
+
+        :param deque[SpanNode] queue: EDUs to be processed
+        :param list[SpanNode] stack: currently processed spans
+
+        """
+        LOGGER.debug("Completing the tree with the fallback strategy")
+        action = self._model.fallback_action
+        while queue:
+            self._operate(queue, stack, SHIFT_ACTION)
+        if action is None and len(stack) > 1:
+            raise ActionError("Model has no reduce actions.")
+        while len(stack) > 1:
+            self._operate(queue, stack, action)
+
+    def parse_hierarchical(self, queue, conll_doc, beam_size=DFLT_BEAM_SIZE,
+                           deadline=None):
+        """Parse sentences first and then combine their trees.
+
+        EDUs are grouped into sentences by the sentence index of their
+        first token.  With greedy decoding and no deadline, subtrees of
+        all sentences are built in lockstep with :meth:`parse_many`;
+        otherwise, sentences are parsed one by one like documents in
+        :meth:`parse`.  The document-level pass then only operates on
+        complete sentence trees.
+
+        :param list[SpanNode] queue: list of input EDUs
+        :param CoNLLDoc conll_doc: CoNLL document
+        :param int beam_size: number of best partial configurations to
+          keep at each step of both passes (1 means greedy decoding)
+        :param deadline: time budget in seconds for the whole document,
+          after which the remaining sentences and the document are
+          completed by right-branching reduces (see :meth:`parse`)
+        :type deadline: float or None
+
+        :return: root of the RST tree
+        :rtype: SpanNode
+
+        """
+        end_time = None if deadline is None else clock() + deadline
+        tokendict = conll_doc.tokendict
+        sentences = []
+        prev_sidx = None
+        for edu in queue:
+            sidx = tokendict[edu.text[0]].sidx
+            if sentences and sidx == prev_sidx:
+                sentences[-1].append(edu)
             else:
-                raise ActionError("No action could be performed.")
-        tree = self._getparsetree()
-        self.reset()
+                sentences.append([edu])
+            prev_sidx = sidx
+        multi_edu = [(edus, conll_doc)
+                     for edus in sentences if len(edus) > 1]
+        # sentence trees are parts of this document and are not counted
+        if beam_size > 1 or end_time is not None:
+            subtrees = iter([self._parse(edus, conll_doc, beam_size,
+                                         end_time=end_time)
+                             for edus, _ in multi_edu])
+        else:
+            subtrees = iter(self._parse_lockstep(multi_edu))
+        sent_trees = [next(subtrees) if len(edus) > 1 else edus[0]
+                      for edus in sentences]
+        tree = self._parse(sent_trees, conll_doc, beam_size,
+                           end_time=end_time)
+        tree.degraded = tree.degraded or any(sent_tree.degraded
+                                             for sent_tree in sent_trees)
+        with self._stats_lock:
+            self.stats["parsed"] += 1
+            self.stats["degraded"] += tree.degraded
         return tree
 
-    def save(self, mpath):
+    def incremental(self, conll_doc):
+        """Start parsing a document whose EDUs arrive one by one.
+
+        :param CoNLLDoc conll_doc: CoNLL document of the incoming EDUs
+
+        :return: parsing session
+        :rtype: IncrementalParser
+
+        """
+        return IncrementalParser(self, conll_doc)
+
+    def parse_many(self, docs, trace=False):
+        """Construct RST trees for multiple documents in lockstep.
+
+        At each step, the current states of all unfinished documents are
+        scored with a single call to the model.  Documents are retired
+        from the batch as soon as their trees are complete.
+
+        :param list[tuple] docs: pairs of input EDUs and their CoNLL
+          documents
+        :param bool trace: return compact action traces instead of trees
+          (the input EDUs are then left untouched, reduced spans are
+          only kept as lightweight `TraceSpan`s, and no tree is built)
+
+        :return: RST trees or traces in the order of the input documents
+        :rtype: list[SpanNode] or list[ActionTrace]
+
+        """
+        results = self._parse_lockstep(docs, trace)
+        with self._stats_lock:
+            self.stats["parsed"] += len(results)
+        return results
+
+    def _parse_lockstep(self, docs, trace=False):
+        """Parse multiple documents in lockstep without updating stats.
+
+        :param list[tuple] docs: pairs of input EDUs and their CoNLL
+          documents
+        :param bool trace: return compact action traces instead of trees
+
+        :return: RST trees or traces in the order of the input documents
+        :rtype: list[SpanNode] or list[ActionTrace]
+
+        """
+        docs = [(list(queue), conll_doc) for queue, conll_doc in docs]
+        states = [(deque(queue), [], conll_doc) for queue, conll_doc in docs]
+        trees = [None] * len(states)
+        action_ids = [[] for _ in states]
+        spans = [[] for _ in states]
+        active = []
+        for i, (queue, stack, _) in enumerate(states):
+            if self._endparsing(queue, stack):
+                trees[i] = stack[0]
+            else:
+                active.append(i)
+        while active:
+            samples = []
+            for i in active:
+                queue, stack, conll_doc = states[i]
+                samples.append((stack[-1] if stack else None,
+                                stack[-2] if len(stack) > 1 else None,
+                                queue[0] if queue else None,
+                                conll_doc))
+            scores = self._model.decision_function(samples)
+            unfinished = []
+            for i, scores_i in zip(active, scores):
+                queue, stack, _ = states[i]
+                action_ids[i].append(
+                    self._greedy_step(queue, stack, scores_i, trace)
+                )
+                spans[i].append(stack[-1].eduspan)
+                if self._endparsing(queue, stack):
+                    trees[i] = stack[0]
+                else:
+                    unfinished.append(i)
+            active = unfinished
+        if trace:
+            return [ActionTrace(self._model.actions, action_ids_i, spans_i,
+                                edus)
+                    for (edus, _), action_ids_i, spans_i
+                    in zip(docs, action_ids, spans)]
+        return trees
+
+    def parse_trace(self, queue, conll_doc):
+        """Greedily parse a document into a compact action trace.
+
+        :param list[SpanNode] queue: list of input EDUs
+        :param CoNLLDoc conll_doc: CoNLL document
+
+        :return: trace of performed actions
+        :rtype: ActionTrace
+
+        """
+        return self.parse_many([(queue, conll_doc)], trace=True)[0]
+
+    def _predict_step(self, queue, stack, conll_doc):
+        """Predict and apply the next action in the given state.
+
+        :param deque[SpanNode] queue: EDUs to be processed
+        :param list[SpanNode] stack: currently processed spans
+        :param CoNLLDoc conll_doc: CoNLL document
+
+        :return: index of the performed action in model's actions
+        :rtype: int
+
+        """
+        # Generate features
+        stack_node1 = None if len(stack) < 1 else stack[-1]
+        stack_node2 = None if len(stack) < 2 else stack[-2]
+        queue_node = queue[0] if queue else None
+        scores = self._model.decision_function(
+            [(stack_node1, stack_node2, queue_node, conll_doc)]
+        )
+        return self._greedy_step(queue, stack, scores[0])
+
+    def _greedy_step(self, queue, stack, scores, trace=False):
+        """Apply the best-scoring action that is valid in the given state.
+
+        :param deque[SpanNode] queue: EDUs to be processed
+        :param list[SpanNode] stack: currently processed spans
+        :param np.array scores: scores of model's actions
+        :param bool trace: push lightweight `TraceSpan`s instead of
+          building `SpanNode`s on reduces
+
+        :return: index of the performed action in model's actions
+        :rtype: int
+
+        :raises ActionError: if no action could be performed
+
+        """
+        best = self._model.best_action(
+            scores, self._model.legal_mask(len(stack), len(queue))
+        )
+        if best < 0:
+            raise ActionError("No action could be performed.")
+        action = self._model.actions[best]
+        if trace and action[0] == "reduce":
+            rnode = stack.pop()
+            lnode = stack.pop()
+            stack.append(TraceSpan(
+                (lnode.eduspan[0], rnode.eduspan[1]),
+                rnode.nucedu if action[1] == "SN" else lnode.nucedu,
+                merge_texts(lnode.text, rnode.text), best))
+        else:
+            self._operate(queue, stack, action)
+        return best
+
+    def _beam_search(self, queue, conll_doc, beam_size, end_time=None):
+        """Find the best action sequence using beam search.
+
+        Each beam state is a 4-tuple of its accumulated log-probability,
+        stack, position of the first queue element, and the list of
+        performed actions.  At every step, all states of the beam are
+        scored with a single call to the model.  Reduced nodes are built
+        without modifying their children, so that states can share them.
+
+        :param list[SpanNode] queue: list of input EDUs
+        :param CoNLLDoc conll_doc: CoNLL document
+        :param int beam_size: number of best states to keep
+        :param end_time: clock time at which the search should stop and
+          return the actions of the best partial state
+        :type end_time: float or None
+
+        :return: best sequence of parsing actions
+        :rtype: list[tuple]
+
+        """
+        model_actions = self._model.actions
+        is_shift = self._model.action_table[:, 0] == SHIFT
+        n_edus = len(queue)
+        # every complete derivation consists of n shifts and n - 1 reduces
+        n_steps = 2 * n_edus - 1
+        beam = [(0., [], 0, [])]
+        for _ in range(n_steps):
+            if end_time is not None and clock() >= end_time:
+                break
+            samples = [(stack[-1] if stack else None,
+                        stack[-2] if len(stack) > 1 else None,
+                        queue[qidx] if qidx < n_edus else None,
+                        conll_doc)
+                       for _, stack, qidx, _ in beam]
+            masks = np.array([self._model.legal_mask(len(stack),
+                                                     n_edus - qidx)
+                              for _, stack, qidx, _ in beam])
+            # normalize scores to log-probabilities
+            scores = log_softmax(self._model.decision_function(samples))
+            scores[~masks] = -np.inf
+            scores += np.array([score for score, _, _, _ in beam])[:, None]
+            scores = scores.ravel()
+            n_best = min(beam_size, scores.size)
+            best = np.argpartition(-scores, n_best - 1)[:n_best]
+            best = best[np.argsort(-scores[best], kind="mergesort")]
+            new_beam = []
+            for idx in best:
+                if not np.isfinite(scores[idx]):
+                    break
+                state_idx, action_idx = divmod(idx, len(model_actions))
+                _, stack, qidx, actions = beam[state_idx]
+                action = model_actions[action_idx]
+                if is_shift[action_idx]:
+                    stack = stack + [queue[qidx]]
+                    qidx += 1
+                else:
+                    stack = stack[:-2] + [
+                        self._merge(stack[-2], stack[-1], action[1])
+                    ]
+                new_beam.append((scores[idx], stack, qidx,
+                                 actions + [action]))
+            if not new_beam:
+                raise ActionError("No action could be performed.")
+            beam = new_beam
+        return beam[0][-1]
+
+    def compact(self, quantize=None, threshold=0.):
+        """Drop features without weights and compress the internal model.
+
+        :param quantize: type in which to store the weights ("float16",
+          "int8", or None to keep float64)
+        :type quantize: str or None
+        :param float threshold: weights whose absolute value does not
+          exceed this threshold are set to zero beforehand
+
+        :return: numbers of features before and after compaction
+        :rtype: tuple(int, int)
+
+        """
+        return self._model.compact(quantize, threshold)
+
+    def save(self, mpath, mmap=False):
         """Save internal model at specifed location.
 
         :param str mpath: path at which to store the model
+        :param bool mmap: store the model in the memory-mappable format
+          (a directory) instead of pickling it
 
         """
         LOGGER.debug("Saving model to %s", mpath)
-        self._model.reset()
-        with open(mpath, "wb") as ofile:
-            dump(self._model, ofile)
-        self._model.restore()
+        if mmap:
+            self._model.save_mmap(mpath)
+        else:
+            self._model.reset()
+            with open(mpath, "wb") as ofile:
+                dump(self._model, ofile)
+            self._model.restore()
         self._mpath = mpath
         LOGGER.debug("Model saved")
 
     def load(self, mpath):
         """Save internal model at the specifed location.
 
+        Models in the memory-mappable format are recognized
+        automatically.
+
         :param str mpath: path from which to load the model
 
         """
         LOGGER.debug("Loading model to %s", mpath)
-        with open(mpath, 'rb') as ifile:
-            self._model = load(ifile)
-        self._model.restore()
+        if is_mmap_model(mpath):
+            self._model = Model.load_mmap(mpath)
+        else:
+            with open(mpath, 'rb') as ifile:
+                self._model = load(ifile)
+            self._model.restore()
         self._mpath = mpath
         LOGGER.debug("Model loaded")
 
@@ -156,76 +620,124 @@ class RSTParser(object):
         :param action_tuple: one specific parsing action,
                              for example: reduce-NS-elaboration
 
+        """
+        self._operate(self.queue, self.stack, action_tuple)
+
+    @classmethod
+    def _operate(cls, queue, stack, action_tuple):
+        """Apply parsing action to the given queue and stack.
+
+        :param deque[SpanNode] queue: EDUs to be processed
+        :param list[SpanNode] stack: currently processed spans
+        :param tuple action_tuple: parsing action to perform
+
+        :raises ActionError: if the action cannot be applied
+
         """
         action, form, relation = action_tuple
         if action == 'shift':
-            if len(self.queue) == 0:
+            if len(queue) == 0:
                 raise ActionError("Shift action with an empty queue")
-            node = self.queue.pop(0)
-            self.stack.append(node)
+            node = queue.popleft()
+            stack.append(node)
         elif action == 'reduce':
-            if len(self.stack) < 2:
+            if len(stack) < 2:
                 raise ActionError(
                     "Reduce action with stack which has less than 2 spans"
                 )
-            rnode = self.stack.pop()
-            lnode = self.stack.pop()
-            # Create a new node
-            # Assign a value to prop, only when it is someone's
-            #   children node
-            node = SpanNode(prop=None)
+            rnode = stack.pop()
+            lnode = stack.pop()
+            node = cls._merge(lnode, rnode, form)
             # Children node
             node.lnode, node.rnode = lnode, rnode
             # Parent node of children nodes
             node.lnode.pnode, node.rnode.pnode = node, node
-            # Node text
-            node.text = lnode.text + rnode.text
-            # EDU span
-            node.eduspan = (lnode.eduspan[0], rnode.eduspan[1])
-            # Nuc span / Nuc EDU
             if form == 'NN':
-                node.nucspan = (lnode.eduspan[0], rnode.eduspan[1])
-                node.nucedu = lnode.nucedu
                 node.lnode.prop = "Nucleus"
                 node.lnode.relation = relation
                 node.rnode.prop = "Nucleus"
                 node.rnode.relation = relation
             elif form == 'NS':
-                node.nucspan = lnode.eduspan
-                node.nucedu = lnode.nucedu
                 node.lnode.prop = "Nucleus"
                 node.lnode.relation = "span"
                 node.rnode.prop = "Satellite"
                 node.rnode.relation = relation
-            elif form == 'SN':
-                node.nucspan = rnode.eduspan
-                node.nucedu = rnode.nucedu
+            else:
                 node.lnode.prop = "Satellite"
                 node.lnode.relation = relation
                 node.rnode.prop = "Nucleus"
                 node.rnode.relation = "span"
-            else:
-                raise ValueError("Unrecognized form: {}".format(form))
-            self.stack.append(node)
+            stack.append(node)
             # How about prop? How to update it?
         else:
             raise ValueError("Unrecoginized parsing action: {}".format(action))
 
-    def _endparsing(self):
+    @staticmethod
+    def _merge(lnode, rnode, form):
+        """Create a parent node for two adjacent spans.
+
+        Children nodes are neither linked to the new node nor modified.
+
+        :param SpanNode lnode: left child
+        :param SpanNode rnode: right child
+        :param str form: nuclearity of the new node (NN, NS, or SN)
+
+        :return: new node covering both spans
+        :rtype: SpanNode
+
+        """
+        # Assign a value to prop, only when it is someone's
+        #   children node
+        node = SpanNode(prop=None)
+        # Node text
+        node.text = merge_texts(lnode.text, rnode.text)
+        # EDU span
+        node.eduspan = (lnode.eduspan[0], rnode.eduspan[1])
+        # Nuc span / Nuc EDU
+        if form == 'NN':
+            node.nucspan = (lnode.eduspan[0], rnode.eduspan[1])
+            node.nucedu = lnode.nucedu
+        elif form == 'NS':
+            node.nucspan = lnode.eduspan
+            node.nucedu = lnode.nucedu
+        elif form == 'SN':
+            node.nucspan = rnode.eduspan
+            node.nucedu = rnode.nucedu
+        else:
+            raise ValueError("Unrecognized form: {}".format(form))
+        return node
+
+    def _endparsing(self, queue=None, stack=None):
         """ Whether we should end parsing
+
+        :param queue: queue to check (internal queue if None)
+        :type queue: deque[SpanNode] or None
+        :param stack: stack to check (internal stack if None)
+        :type stack: list[SpanNode] or None
+
         """
-        if (len(self.stack) == 1) and (len(self.queue) == 0):
+        queue = self.queue if queue is None else queue
+        stack = self.stack if stack is None else stack
+        if (len(stack) == 1) and (len(queue) == 0):
             return True
-        elif (len(self.stack) == 0) and (len(self.queue) == 0):
+        elif (len(stack) == 0) and (len(queue) == 0):
             raise ParseError("Illegal stack/queue status")
         else:
             return False
 
-    def _getparsetree(self):
+    def _getparsetree(self, queue=None, stack=None):
         """ Get the entire parsing tree
+
+        :param queue: final queue (internal queue if None)
+        :type queue: deque[SpanNode] or None
+        :param stack: final stack (internal stack if None)
+        :type stack: list[SpanNode] or None
+
         """
-        if (len(self.stack) == 1) and (len(self.queue) == 0):
-            return self.stack[0]
+        queue = self.queue if queue is None else queue
+        stack = self.stack if stack is None else stack
+        if (len(stack) == 1) and (len(queue) == 0):
+            return stack[0]
         else:
             return None
 
@@ -234,4 +746,99 @@ class RSTParser(object):
 
         """
         del self.stack[:]
-        del self.queue[:]
+        self.queue.clear()
+
+
+class TreeSamples(object):
+    """Re-iterable stream of training samples of RST trees.
+
+    Every iteration reads the trees anew and generates their samples
+    one tree at a time.
+
+    """
+    def __init__(self, rst_trees):
+        """Class constructor.
+
+        :param rst_trees: re-iterable source of RST trees
+        :type rst_trees: iterable[rstparser.tree.RSTTree]
+
+        """
+        self.rst_trees = rst_trees
+
+    def __iter__(self):
+        for tree in self.rst_trees:
+            actions, samples = tree.generate_samples()
+            for sample, action in zip(samples, actions):
+                yield sample, action
+
+
+class IncrementalParser(object):
+    """Parsing session which consumes EDUs as they arrive.
+
+    Parsing decisions only look at the first EDU of the queue, so every
+    decision can be made as soon as the next EDU is known.  The parser
+    therefore advances as far as possible after each new EDU and only
+    keeps the current stack and at most one pending EDU in memory.
+
+    Note that features which depend on the document length (e.g., the
+    distance to the end of the document) are computed with respect to
+    the EDUs that have been added to the CoNLL document so far.
+
+    """
+    def __init__(self, parser, conll_doc):
+        """Class constructor.
+
+        :param RSTParser parser: parser whose model should be used
+        :param CoNLLDoc conll_doc: CoNLL document of the incoming EDUs
+
+        """
+        self._parser = parser
+        self._conll_doc = conll_doc
+        self._queue = deque()
+        self._stack = []
+        self._tree = None
+
+    @property
+    def subtrees(self):
+        """Get partial trees which are currently on the stack.
+
+        :return: roots of partial trees from left to right
+        :rtype: list[SpanNode]
+
+        """
+        return list(self._stack)
+
+    def feed(self, edu):
+        """Add the next EDU and perform all decisions it allows.
+
+        The tokens of the EDU should already be present in the CoNLL
+        document.
+
+        :param SpanNode edu: next elementary discourse unit
+
+        :return: current partial trees
+        :rtype: list[SpanNode]
+
+        """
+        if self._tree is not None:
+            raise ParseError("Cannot add EDUs to a finished parse")
+        self._queue.append(edu)
+        while self._queue:
+            self._parser._predict_step(self._queue, self._stack,
+                                       self._conll_doc)
+        return self.subtrees
+
+    def finish(self):
+        """Signal the end of stream and complete the tree.
+
+        :return: root of the complete RST tree
+        :rtype: SpanNode
+
+        """
+        if self._tree is None:
+            while not self._parser._endparsing(self._queue, self._stack):
+                self._parser._predict_step(self._queue, self._stack,
+                                           self._conll_doc)
+            self._tree = self._parser._getparsetree(self._queue,
+                                                    self._stack)
+        return self._tree
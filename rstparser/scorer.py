@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# -*- mode: python; coding: utf-8 -*-
+
+"""Lightweight scoring of parser states with exported linear weights.
+
+"""
+
+##################################################################
+# Imports
+from __future__ import absolute_import, print_function, unicode_literals
+
+import numpy as np
+
+from .feature import FrozenVocabulary
+
+
+##################################################################
+# Constants
+DFLT_DTYPE = np.float32
+# types in which compacted weights can be stored
+QUANTIZATIONS = ("float16", "int8")
+INT8_MAX = 127
+
+
+##################################################################
+# Classes
+class LinearScorer(object):
+    """Linear classifier reduced to a weight matrix and a feature index.
+
+    Scores of a parser state are the bias plus the sum of the weight
+    rows of its active features (scaled by their values).  The rows are
+    gathered and accumulated with NumPy directly from the column indices
+    of :meth:`rstparser.feature.FeatureExtractor.extract_cols`, without
+    building (and validating) intermediate sparse matrices.
+
+    Note that linear SVMs trained with the Crammer-Singer loss often
+    produce nearly tied scores, so that accumulating in float32 changes
+    some decisions compared to the float64 scores of scikit-learn.
+
+    Quantized weights (see `QUANTIZATIONS`) are kept in their type, and
+    only the gathered rows are converted to the type of the scores, to
+    which the scales of int8 weights are applied.
+
+    """
+    def __init__(self, vocab, weights, bias, dtype=DFLT_DTYPE, scale=None):
+        """Class constructor.
+
+        :param vocab: column indices of features
+        :type vocab: rstparser.feature.FrozenVocabulary or dict
+        :param np.array weights: weight matrix with one row per feature
+          and one column per class
+        :param np.array bias: bias vector with one element per class
+        :param type dtype: type in which the scores are accumulated
+        :param scale: scales of the classes' int8 weights
+        :type scale: np.array or None
+
+        """
+        if not isinstance(vocab, FrozenVocabulary):
+            vocab = FrozenVocabulary(vocab)
+        self.vocab = vocab
+        weights = np.asarray(weights)
+        if weights.dtype.name not in QUANTIZATIONS:
+            weights = weights.astype(dtype, copy=False)
+        self.weights = np.ascontiguousarray(weights)
+        self.bias = np.asarray(bias, dtype=dtype)
+        self.scale = None if scale is None else np.asarray(scale,
+                                                           dtype=dtype)
+        if self.weights.shape != (vocab.n_features, self.bias.shape[0]):
+            raise ValueError(
+                "Weight matrix of shape {!r} does not match {:d} features"
+                " and {:d} classes".format(self.weights.shape,
+                                           vocab.n_features,
+                                           self.bias.shape[0]))
+
+    @classmethod
+    def from_pipeline(cls, pipeline, dtype=DFLT_DTYPE):
+        """Export weights of a DictVectorizer and a linear classifier.
+
+        :param sklearn.pipeline.Pipeline pipeline: fitted pipeline whose
+          first step has a `vocabulary_` and whose last step has `coef_`
+          and `intercept_` (e.g., DictVectorizer and LinearSVC)
+        :param type dtype: type in which the scores are accumulated
+
+        :return: scorer equivalent to the pipeline's decision function
+        :rtype: LinearScorer
+
+        :raises ValueError: if the pipeline is not linear or has no
+          feature vocabulary
+
+        """
+        vect = pipeline.steps[0][1]
+        clf = pipeline.steps[-1][1]
+        if not hasattr(vect, "vocabulary_") or not hasattr(clf, "coef_"):
+            raise ValueError("Only fitted pipelines of a feature vocabulary"
+                             " and a linear classifier can be exported")
+        coef = clf.coef_
+        if hasattr(coef, "toarray"):
+            coef = coef.toarray()
+        return cls(vect.vocabulary_, coef.T, np.ravel(clf.intercept_), dtype)
+
+    @classmethod
+    def from_compact(cls, vocab, weights, bias, dtype=DFLT_DTYPE):
+        """Build a scorer from compacted weights without dequantizing them.
+
+        :param vocab: column indices of features
+        :type vocab: rstparser.feature.FrozenVocabulary or dict
+        :param SparseWeights weights: compacted weights (one row per
+          class)
+        :param np.array bias: bias vector with one element per class
+        :param type dtype: type in which the scores are accumulated
+
+        :return: scorer whose weights have one row per feature
+        :rtype: LinearScorer
+
+        """
+        stored_type = weights.data.dtype
+        if stored_type.name not in QUANTIZATIONS:
+            stored_type = dtype
+        matrix = np.zeros(weights.shape[::-1], dtype=stored_type)
+        rows = np.repeat(np.arange(weights.shape[0]),
+                         np.diff(weights.indptr))
+        matrix[weights.indices, rows] = weights.data
+        return cls(vocab, matrix, bias, dtype, weights.scale)
+
+    @property
+    def n_classes(self):
+        """Get number of score columns.
+
+        :rtype: int
+
+        """
+        return self.bias.shape[0]
+
+    def score(self, indices, data, indptr):
+        """Compute scores of parser states.
+
+        :param np.array indices: column indices of the active features of
+          all states (one after another)
+        :param np.array data: values of the active features
+        :param np.array indptr: offsets of the features of each state in
+          `indices` and `data` (with a final entry for the end)
+
+        :return: matrix of scores (one row per state)
+        :rtype: np.array
+
+        """
+        n_states = len(indptr) - 1
+        dtype = self.bias.dtype
+        data = np.asarray(data, dtype=dtype)
+        rows = self.weights[indices]
+        if rows.dtype != dtype:
+            rows = rows.astype(dtype)
+        if n_states == 1:
+            # a single state (as in greedy parsing) is a vector product
+            sums = np.dot(data, rows)
+            if self.scale is not None:
+                sums *= self.scale
+            return (self.bias + sums)[None]
+        scores = np.empty((n_states, self.n_classes), dtype=dtype)
+        scores[:] = self.bias
+        if len(indices):
+            rows *= data[:, None]
+            starts = np.asarray(indptr[:-1])
+            nonempty = starts < indptr[1:]
+            sums = np.add.reduceat(rows, starts[nonempty], axis=0)
+            if self.scale is not None:
+                sums *= self.scale
+            scores[nonempty] += sums
+        return scores
+
+
+class SparseWeights(object):
+    """Weight matrix stored in the CSR format with optional quantization.
+
+    Values are kept in their original type, as float16, or as int8 with
+    one scale per row (class).  Column indices use 16 bits if the number
+    of columns permits.
+
+    """
+    def __init__(self, data, indices, indptr, shape, scale=None):
+        """Class constructor.
+
+        :param np.array data: (quantized) non-zero values
+        :param np.array indices: column indices of the values
+        :param np.array indptr: offsets of the rows in `data` and `indices`
+        :param tuple shape: number of rows and columns
+        :param scale: scales of int8 rows
+        :type scale: np.array or None
+
+        """
+        self.data = data
+        self.indices = indices
+        self.indptr = indptr
+        self.shape = tuple(shape)
+        self.scale = scale
+
+    @classmethod
+    def from_dense(cls, matrix, quantize=None):
+        """Compress a dense weight matrix.
+
+        :param np.array matrix: weight matrix (one row per class)
+        :param quantize: type in which to store the values (one of
+          `QUANTIZATIONS` or None to keep the original type)
+        :type quantize: str or None
+
+        :return: compressed matrix
+        :rtype: SparseWeights
+
+        :raises ValueError: on unknown quantization types
+
+        """
+        if quantize is not None and quantize not in QUANTIZATIONS:
+            raise ValueError("Unknown quantization: {!r}".format(quantize))
+        matrix = np.asarray(matrix)
+        rows, cols = np.nonzero(matrix)
+        values = matrix[rows, cols]
+        indptr = np.zeros(matrix.shape[0] + 1, dtype=np.int32)
+        np.cumsum(np.bincount(rows, minlength=matrix.shape[0]),
+                  out=indptr[1:])
+        idx_type = np.uint16 if matrix.shape[1] <= 2**16 else np.int32
+        scale = None
+        if quantize == "int8":
+            scale = np.abs(matrix).max(axis=1) / INT8_MAX
+            scale[scale == 0] = 1.
+            values = np.round(values / scale[rows]).astype(np.int8)
+        elif quantize == "float16":
+            values = values.astype(np.float16)
+        return cls(values, cols.astype(idx_type), indptr, matrix.shape,
+                   scale)
+
+    @property
+    def nnz(self):
+        """Get number of stored values.
+
+        :rtype: int
+
+        """
+        return len(self.data)
+
+    @property
+    def nbytes(self):
+        """Get memory of the stored arrays in bytes.
+
+        :rtype: int
+
+        """
+        return sum(arr.nbytes for arr in (self.data, self.indices,
+                                          self.indptr, self.scale)
+                   if arr is not None)
+
+    def toarray(self, dtype=np.float64):
+        """Restore the dense (dequantized) weight matrix.
+
+        :param type dtype: type of the restored matrix
+
+        :rtype: np.array
+
+        """
+        matrix = np.zeros(self.shape, dtype=dtype)
+        rows = np.repeat(np.arange(self.shape[0]), np.diff(self.indptr))
+        values = self.data.astype(dtype)
+        if self.scale is not None:
+            values *= self.scale[rows]
+        matrix[rows, self.indices] = values
+        return matrix
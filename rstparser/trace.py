@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- mode: python; coding: utf-8 -*-
+
+"""Compact records of shift-reduce derivations.
+
+"""
+
+##################################################################
+# Imports
+from __future__ import absolute_import, print_function, unicode_literals
+
+from collections import deque
+
+import numpy as np
+
+
+##################################################################
+# Classes
+class TraceSpan(object):
+    """Lightweight stack entry for spans reduced during traced parsing.
+
+    It only holds what features look at and the id of the action which
+    produced the span.  Full `SpanNode`s are built from the trace later.
+
+    """
+    __slots__ = ("eduspan", "nucedu", "text", "action_id")
+
+    def __init__(self, eduspan, nucedu, text, action_id):
+        """Class constructor.
+
+        :param tuple eduspan: first and last EDU of the span
+        :param int nucedu: nuclear EDU of the span
+        :param text: token indices of the span
+        :type text: range or list[int] or None
+        :param int action_id: index of the reduce action in the action
+          table
+
+        """
+        self.eduspan = eduspan
+        self.nucedu = nucedu
+        self.text = text
+        self.action_id = action_id
+
+
+class ActionTrace(object):
+    """Array-backed trace of the actions which produced an RST tree.
+
+    Trees, dis strings, or JSON dictionaries are only built from the
+    trace on demand.
+
+    """
+    def __init__(self, actions, action_ids, spans, edus):
+        """Class constructor.
+
+        :param list[tuple] actions: table of parsing actions
+        :param list[int] action_ids: indices of performed actions in the
+          action table
+        :param list[tuple] spans: EDU spans of the nodes produced by the
+          performed actions
+        :param list[SpanNode] edus: input EDUs
+
+        """
+        self.actions = actions
+        self.action_ids = np.array(action_ids, dtype=np.int32)
+        self.spans = np.array(spans, dtype=np.int32).reshape(-1, 2)
+        self.edus = edus
+
+    def __len__(self):
+        return len(self.action_ids)
+
+    def __iter__(self):
+        """Iterate over the performed action tuples.
+
+        """
+        actions = self.actions
+        for action_id in self.action_ids:
+            yield actions[action_id]
+
+    def to_tree(self):
+        """Build the RST tree by replaying the trace on the input EDUs.
+
+        :return: root of the RST tree
+        :rtype: SpanNode
+
+        """
+        from .parser import RSTParser
+        queue = deque(self.edus)
+        stack = []
+        for action in self:
+            RSTParser._operate(queue, stack, action)
+        return stack[0]
+
+    def to_str(self, conll_doc):
+        """Return string representation of the tree in DIS format.
+
+        :param CoNLLDoc conll_doc: CoNLL document of the input EDUs
+
+        :return: RST tree in DIS format
+        :rtype: str
+
+        """
+        return self.to_tree().to_str(conll_doc)
+
+    def to_dict(self):
+        """Convert the trace to a dictionary representation of the tree.
+
+        Terminal nodes get the ids of their EDUs, and abstract nodes get
+        negative ids in pre-order.
+
+        :return: dictionary representation of the tree
+        :rtype: dict
+
+        """
+        stack = []
+        edus = iter(self.edus)
+        for action, form, relation in self:
+            if action == "shift":
+                edu = next(edus)
+                stack.append({"rel2par": edu.relation, "n/s": edu.prop,
+                              "children": [], "id": edu.nucedu})
+                continue
+            rnode = stack.pop()
+            lnode = stack.pop()
+            if form == "NN":
+                lnode["n/s"], lnode["rel2par"] = "Nucleus", relation
+                rnode["n/s"], rnode["rel2par"] = "Nucleus", relation
+            elif form == "NS":
+                lnode["n/s"], lnode["rel2par"] = "Nucleus", "span"
+                rnode["n/s"], rnode["rel2par"] = "Satellite", relation
+            else:
+                lnode["n/s"], lnode["rel2par"] = "Satellite", relation
+                rnode["n/s"], rnode["rel2par"] = "Nucleus", "span"
+            stack.append({"rel2par": None, "n/s": None,
+                          "children": [lnode, rnode], "id": None})
+        root = stack[0]
+        # assign ids to abstract nodes in pre-order
+        node_id = -1
+        nodes = [root]
+        while nodes:
+            node = nodes.pop()
+            if node["children"]:
+                node["id"] = node_id
+                node_id -= 1
+                nodes.extend(reversed(node["children"]))
+        return root
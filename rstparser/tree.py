@@ -15,12 +15,13 @@
 # Imports
 from __future__ import absolute_import, print_function, unicode_literals
 
+from collections import deque
 import re
 
-from .conll import CoNLLToken
+from .conll import CoNLLToken, TokenTable
 from .node import SpanNode
 from .parser import RSTParser
-from .utils import LOGGER
+from .utils import LOGGER, merge_texts
 
 
 ##################################################################
@@ -64,6 +65,8 @@ class RSTTree(object):
         self._tree = None
         self._edudict = None
         self._tokendict = None
+        self._doc_feats = None
+        self._token_table = None
         self._conll_doc = conll_doc
         self.parse_dis(dis)
         # synchronize internal RST tree with CoNLL information
@@ -101,6 +104,36 @@ class RSTTree(object):
             self._tokendict = tokendict
         return self._tokendict
 
+    @property
+    def token_table(self):
+        """Get array-backed representation of the tokens.
+
+        """
+        if self._conll_doc is not None:
+            return self._conll_doc.token_table
+        if self._token_table is None:
+            self._token_table = TokenTable(self.tokendict)
+        return self._token_table
+
+    @property
+    def doc_feats(self):
+        """Get cached per-document feature information.
+
+        """
+        if self._conll_doc is not None:
+            return self._conll_doc.doc_feats
+        return self._doc_feats
+
+    @doc_feats.setter
+    def doc_feats(self, doc_feats):
+        """Set cached per-document feature information.
+
+        """
+        if self._conll_doc is not None:
+            self._conll_doc.doc_feats = doc_feats
+        else:
+            self._doc_feats = doc_feats
+
     @property
     def edudict(self):
         """Get mapping from EDU id to global token indices.
@@ -154,8 +187,7 @@ class RSTTree(object):
         dis = dis.replace('(', ' ( ').replace(')', ' ) ')
         tokens = preprocess(dis.split())
         stack = []
-        while tokens:
-            token = tokens.pop(0)
+        for i, token in enumerate(tokens):
             if token == ')':
                 # If ')', start processing
                 content = []  # Content in the stack
@@ -199,7 +231,7 @@ class RSTTree(object):
                     raise ValueError(
                         ("Unrecognized parsing label: {} \n\twith"
                          " content = {}\n\tstack={}\n\tqueue={}").format(
-                             label, content, stack, tokens))
+                             label, content, stack, tokens[i + 1:]))
             else:
                 # else, keep push into the stack
                 stack.append(token)
@@ -214,7 +246,7 @@ class RSTTree(object):
         # Parsing action
         actionlist = self.decodeSRaction()
         # Initialize queue and stack
-        queue = self.get_edu_nodes()
+        queue = deque(self.get_edu_nodes())
         stack = []
         sr = RSTParser(queue, stack, None)
         # Start simulating the shift-reduce parsing
@@ -243,7 +275,7 @@ class RSTTree(object):
             if (node.lnode is not None) and (node.rnode is not None):
                 # Non-leaf node
                 node.eduspan = self._getspaninfo(node.lnode, node.rnode)
-                node.text = self._gettextinfo(edudict, node.eduspan)
+                node.text = merge_texts(node.lnode.text, node.rnode.text)
                 if node.relation is None:
                     # If it is a new node
                     if node.prop == 'Root':
@@ -263,7 +295,7 @@ class RSTTree(object):
                 raise ValueError("Unexpected right node")
             else:
                 # Leaf node
-                node.text = self._gettextinfo(edudict, node.eduspan)
+                node.text = edudict[node.eduspan[0]]
         return treenodes[-1]
 
     def binarize(self):
@@ -274,29 +306,28 @@ class RSTTree(object):
         """
         queue = [self._tree]
         while queue:
-            node = queue.pop(0)
-            queue += node.nodelist
+            node = queue.pop()
+            children = node.nodelist
+            queue += children
             # Construct binary tree
-            if len(node.nodelist) == 2:
-                node.lnode = node.nodelist[0]
-                node.rnode = node.nodelist[1]
-                # Parent node
-                node.lnode.pnode = node
-                node.rnode.pnode = node
-            elif len(node.nodelist) > 2:
-                # Remove one node from the nodelist
-                node.lnode = node.nodelist.pop(0)
-                newnode = SpanNode(node.nodelist[0].prop)
-                newnode.nodelist += node.nodelist
-                # Right-branching
-                node.rnode = newnode
+            if len(children) >= 2:
+                # Right-branching: every intermediate node takes the next
+                # child as its left node and the remaining ones as a new
+                # right node
+                for i, child in enumerate(children[:-2]):
+                    newnode = SpanNode(children[i + 1].prop)
+                    node.lnode = child
+                    node.rnode = newnode
+                    # Parent node
+                    node.lnode.pnode = node
+                    node.rnode.pnode = node
+                    node.nodelist = []
+                    node = newnode
+                node.lnode = children[-2]
+                node.rnode = children[-1]
                 # Parent node
                 node.lnode.pnode = node
                 node.rnode.pnode = node
-                # Add to the head of the queue
-                # So the code will keep branching
-                # until the nodelist size is 2
-                queue.insert(0, newnode)
             # Clear nodelist for the current node
             node.nodelist = []
         return self
@@ -305,10 +336,10 @@ class RSTTree(object):
         """ Breadth-first treavsal on binary RST tree
 
         """
-        queue = [self._tree]
+        queue = deque([self._tree])
         bft_nodelist = []
         while queue:
-            node = queue.pop(0)
+            node = queue.popleft()
             bft_nodelist.append(node)
             if node.lnode is not None:
                 queue.append(node.lnode)
@@ -441,21 +472,6 @@ class RSTTree(object):
             raise ValueError("Error when find relation for new node")
         return relation
 
-    def _gettextinfo(self, edudict, eduspan):
-        """ Get text span for parent node
-
-        :type edudict: dict of list
-        :param edudict: EDU from this document
-
-        :type eduspan: tuple with two elements
-        :param eduspan: start/end of EDU IN this span
-        """
-        text = []
-        for idx in range(eduspan[0], eduspan[1]+1, 1):
-            text += edudict[idx]
-        # Return: A list of token indices
-        return text
-
     def _sync(self):
         """Synchronize RST tree with CoNLL information.
 
@@ -486,11 +502,17 @@ class RSTTree(object):
         :param nodelist: list of node in post order
 
         """
-        if tree.lnode is not None:
-            self.postorder_DFT(tree.lnode, nodelist)
-        if tree.rnode is not None:
-            self.postorder_DFT(tree.rnode, nodelist)
-        nodelist.append(tree)
+        stack = [(tree, False)]
+        while stack:
+            node, visited = stack.pop()
+            if visited:
+                nodelist.append(node)
+                continue
+            stack.append((node, True))
+            if node.rnode is not None:
+                stack.append((node.rnode, False))
+            if node.lnode is not None:
+                stack.append((node.lnode, False))
         return nodelist
 
     def decodeSRaction(self):
@@ -8,6 +8,7 @@
 from __future__ import absolute_import, print_function, unicode_literals
 
 from scipy.sparse import lil_matrix
+from six.moves import range
 import logging
 import os
 
@@ -116,3 +117,29 @@ def getgrams(text, tokendict):
             + ' ' + tokendict[text[-1]].lemma.lower()
         grams.append(token)
     return grams
+
+
+def merge_texts(ltext, rtext):
+    """Concatenate token indices of two spans.
+
+    Adjacent contiguous spans are merged into a single range, whereas
+    token indices of non-adjacent or non-contiguous spans are kept as a
+    list, so that the result always equals `ltext + rtext`.
+
+    :param ltext: token indices of the left span
+    :type ltext: range or list[int] or None
+    :param rtext: token indices of the right span
+    :type rtext: range or list[int] or None
+
+    :return: token indices of the merged span
+    :rtype: range or list[int] or None
+
+    """
+    if not ltext:
+        return rtext
+    if not rtext:
+        return ltext
+    if isinstance(ltext, range) and isinstance(rtext, range) \
+       and ltext[-1] + 1 == rtext[0]:
+        return range(ltext[0], rtext[-1] + 1)
+    return list(ltext) + list(rtext)